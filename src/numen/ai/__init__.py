@@ -1,302 +1,948 @@
 """AI integration for Numen."""
 
+import asyncio
+import functools
+import hashlib
 import json
-from typing import Dict, List, Optional, Union
+import sys
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+import importlib
 import importlib.util
-
-from rich.console import Console
+from types import ModuleType
 
 from numen.config import get_ai_config
-from numen.utils import optimize_large_content
+from numen.ai.retry import aretry_call, retry_call
+from numen.ai.tokens import count_tokens, input_budget, trim_to_tokens
+from numen.utils import json_dumps, json_loads
 
-console = Console()
+if TYPE_CHECKING:
+    from rich.console import Console
+
+    from numen.ai.cache import DiskCache
+    from numen.ai.semantic_cache import SemanticCache
+
+_console_instance: Optional["Console"] = None
+
+
+def _console() -> "Console":
+    """Return the shared console, creating it on first use."""
+    global _console_instance
+    if _console_instance is None:
+        from rich.console import Console
+        _console_instance = Console()
+    return _console_instance
+
+
+def _report_error(message: str) -> None:
+    """Report a provider error; plain text when stderr is not a terminal.
+    
+    Errors inside retry and batch loops can be frequent, and piped output
+    gains nothing from rich markup parsing.
+    """
+    if sys.stderr.isatty():
+        _console().print(f"[red]{message}")
+    else:
+        sys.stderr.write(message + "\n")
 
-# Track available providers
-AVAILABLE_PROVIDERS = {
-    "anthropic": False,
-    "openai": False,
-    "gemini": False,
-    "ollama": True,  # Always available as it only uses requests
-}
 
-# Check which providers are installed
-try:
-    importlib.util.find_spec("anthropic")
-    AVAILABLE_PROVIDERS["anthropic"] = True
-except ImportError:
-    pass
+@functools.cache
+def _has(module: str) -> bool:
+    """Return whether module can be imported, probing only on first use."""
+    try:
+        return importlib.util.find_spec(module) is not None
+    except ImportError:
+        # find_spec imports parent packages, e.g. google for google.generativeai
+        return False
 
-try:
-    importlib.util.find_spec("openai")
-    AVAILABLE_PROVIDERS["openai"] = True
-except ImportError:
-    pass
 
-try:
-    importlib.util.find_spec("google.generativeai")
-    AVAILABLE_PROVIDERS["gemini"] = True
-except ImportError:
-    pass
+def available_providers() -> Dict[str, bool]:
+    """Return which AI providers have their libraries installed."""
+    return {
+        "anthropic": _has("anthropic"),
+        "openai": _has("openai"),
+        "gemini": _has("google.generativeai"),
+        "ollama": True,  # Always available as it only uses requests
+    }
 
-EXPAND_PROMPT = """You're a professional writer. Expand on the following text into 2–3 cohesive paragraphs of prose while keeping the original voice and tone. Return only the expanded text without any explanations:
 
-{selected_text}
+# The system prompt never changes between requests. Every provider sends it
+# first, in the same form, so it forms a stable prefix that server-side prompt
+# caches (and Ollama's KV cache) can reuse; the note text always goes last.
+SYSTEM_PROMPT = "You are a helpful writing assistant that helps expand, summarize, or transform text."
+
+# Prompts are stored as fixed prefixes and the note text is appended with
+# plain concatenation, so braces in a note can never be mistaken for fields.
+EXPAND_PREFIX = """You're a professional writer. Expand on the following text into 2–3 cohesive paragraphs of prose while keeping the original voice and tone. Return only the expanded text without any explanations:
+
 """
 
-SUMMARIZE_PROMPT = """Summarize the following note into bullet points with key takeaways. Keep technical details if present. Return only the summary without any explanations:
+SUMMARIZE_PREFIX = """Summarize the following note into bullet points with key takeaways. Keep technical details if present. Return only the summary without any explanations:
 
-{note}
 """
 
-POETIC_PROMPT = """Rewrite this text in the form of a metaphorical poem, keeping the meaning but transforming the tone. Return only the poem without any explanations:
+POETIC_PREFIX = """Rewrite this text in the form of a metaphorical poem, keeping the meaning but transforming the tone. Return only the poem without any explanations:
 
-{selected_text}
 """
 
+# Output budgets per action; bullet-point summaries rarely need more than a few hundred tokens
+DEFAULT_MAX_TOKENS = 1024
+ACTION_MAX_TOKENS = {
+    "expand": 800,
+    "summarize": 256,
+    "poetic": 400,
+}
+
+PROMPT_PREFIXES = {
+    "expand": EXPAND_PREFIX,
+    "summarize": SUMMARIZE_PREFIX,
+    "poetic": POETIC_PREFIX,
+}
+
+
+class StreamError(str):
+    """An error message yielded by a stream in place of (the rest of) the answer.
+    
+    It reads like any other chunk, but tells callers not to cache what was streamed.
+    """
+
 
 class AIProvider:
     """Base class for AI providers."""
     
+    # Module path of the provider SDK, imported lazily by _import_sdk()
+    _sdk_name = ""
+    _sdk: Any = None
+    _provider_name = ""
+    
+    @classmethod
+    def _import_sdk(cls) -> Any:
+        """Import the provider SDK on first use and keep it on the class."""
+        if cls._sdk is None:
+            cls._sdk = importlib.import_module(cls._sdk_name)
+        return cls._sdk
+    
     def __init__(self) -> None:
         self.config = get_ai_config()
-        self.max_content_size = 100000
+        self.max_input_tokens = self.config.get("max_input_tokens", 25000)
+        self.temperature: float = self.config.get("temperature", 0.7)
+        self.cache_enabled: bool = self.config.get("cache_enabled", True)
+        self.cache_all: bool = self.config.get("cache_all", False)
+        self.cache_ttl: int = self.config.get("cache_ttl", 86400)
+        self._cache: Optional["DiskCache"] = None
+        self._semantic_caches: Dict[str, "SemanticCache"] = {}
+        self.action_max_tokens: Dict[str, int] = {**ACTION_MAX_TOKENS, **self.config.get("action_max_tokens", {})}
     
     def expand(self, text: str) -> str:
         """Expand the given text."""
-        optimized_text = optimize_large_content(text, self.max_content_size)
-        prompt = EXPAND_PROMPT.format(selected_text=optimized_text)
-        return self.generate_text(prompt)
+        optimized_text, prompt = self._build_prompt("expand", text)
+        return self._semantic_generate("expand", optimized_text, prompt)
     
     def summarize(self, text: str) -> str:
         """Summarize the given text."""
-        optimized_text = optimize_large_content(text, self.max_content_size)
-        prompt = SUMMARIZE_PROMPT.format(note=optimized_text)
-        return self.generate_text(prompt)
+        optimized_text, prompt = self._build_prompt("summarize", text)
+        return self._semantic_generate("summarize", optimized_text, prompt)
     
     def poetic(self, text: str) -> str:
         """Transform the given text into poetry."""
-        optimized_text = optimize_large_content(text, self.max_content_size)
-        prompt = POETIC_PROMPT.format(selected_text=optimized_text)
-        return self.generate_text(prompt)
+        optimized_text, prompt = self._build_prompt("poetic", text)
+        return self._semantic_generate("poetic", optimized_text, prompt)
     
-    def generate_text(self, prompt: str) -> str:
+    def stream(self, action: str, text: str) -> Iterator[str]:
+        """Run an action on the given text, yielding the response as it arrives."""
+        optimized_text, prompt = self._build_prompt(action, text)
+        
+        cache = self._get_semantic_cache(action)
+        if cache is not None:
+            cached = cache.get(optimized_text)
+            if cached is not None:
+                yield cached
+                return
+        
+        parts = []
+        failed = False
+        for chunk in self.generate_text_stream(prompt, action):
+            parts.append(chunk)
+            failed = failed or isinstance(chunk, StreamError)
+            yield chunk
+        
+        result = "".join(parts)
+        if cache is not None and not failed and not result.startswith("Error"):
+            cache.set(optimized_text, result)
+    
+    def _build_prompt(self, action: str, text: str) -> Tuple[str, str]:
+        """Trim text for the model and wrap it in the prompt for action.
+        
+        Returns the trimmed text together with the full prompt.
+        """
+        if action not in PROMPT_PREFIXES:
+            raise ValueError(f"Unknown action: {action}")
+        
+        optimized_text = self._trim_input(text)
+        return optimized_text, PROMPT_PREFIXES[action] + optimized_text + "\n"
+    
+    def _max_tokens(self, action: Optional[str]) -> int:
+        """Return the output token budget for action."""
+        if action is None:
+            return DEFAULT_MAX_TOKENS
+        return self.action_max_tokens.get(action, DEFAULT_MAX_TOKENS)
+    
+    def _model_name(self) -> str:
+        """Return the model requests are sent to."""
+        model: str = self.config.get("default_model", "")
+        return model
+    
+    def _count_tokens(self, text: str) -> int:
+        return count_tokens(self._provider_name, self._model_name(), text)
+    
+    def _trim_input(self, text: str) -> str:
+        """Trim text to the token budget of the configured model."""
+        budget = input_budget(self._model_name(), self.max_input_tokens)
+        trimmed = trim_to_tokens(text, budget, self._count_tokens)
+        if trimmed is not text:
+            _console().print(f"[yellow]Note is too large for the model; trimmed to about {budget:,} tokens ({len(text):,} to {len(trimmed):,} chars).[/yellow]")
+        return trimmed
+    
+    def _get_semantic_cache(self, action: str) -> Optional["SemanticCache"]:
+        """Return the similarity cache for an action, or None when disabled."""
+        if not self.config.get("semantic_cache", False):
+            return None
+        
+        if action not in self._semantic_caches:
+            from numen.ai.semantic_cache import SemanticCache
+            self._semantic_caches[action] = SemanticCache(
+                namespace=f"{type(self).__name__}:{self.config.get('default_model', '')}:{action}",
+                threshold=self.config.get("semantic_cache_threshold", 0.92),
+                ttl=self.config.get("semantic_cache_ttl", 3600),
+                backend=self.config.get("embedding_backend", "ollama"),
+                model=self.config.get("embedding_model", "mxbai-embed-large"),
+                base_url=self.config.get("ollama_base_url", "http://localhost:11434"),
+            )
+        return self._semantic_caches[action]
+    
+    def _semantic_generate(self, action: str, text: str, prompt: str) -> str:
+        """Answer from the similarity cache when text matches an earlier request."""
+        cache = self._get_semantic_cache(action)
+        if cache is None:
+            return self.generate_text(prompt, action)
+        
+        cached = cache.get(text)
+        if cached is not None:
+            return cached
+        
+        result = self.generate_text(prompt, action)
+        if not result.startswith("Error"):
+            cache.set(text, result)
+        return result
+    
+    async def _asemantic_generate(self, action: str, text: str, prompt: str) -> str:
+        """Async counterpart of _semantic_generate."""
+        cache = self._get_semantic_cache(action)
+        if cache is None:
+            return await self.agenerate_text(prompt, action)
+        
+        cached = await asyncio.to_thread(cache.get, text)
+        if cached is not None:
+            return cached
+        
+        result = await self.agenerate_text(prompt, action)
+        if not result.startswith("Error"):
+            await asyncio.to_thread(cache.set, text, result)
+        return result
+    
+    def generate_text(self, prompt: str, action: Optional[str] = None) -> str:
+        """Generate text from a prompt, reusing a cached response when possible.
+        
+        action selects the output token budget; other prompts get DEFAULT_MAX_TOKENS.
+        """
+        return self._cached_generate(prompt, self._generate_text, self._max_tokens(action))
+    
+    def _retryable_errors(self) -> tuple:
+        """Exception types that are transient and worth retrying."""
+        return ()
+    
+    def _generate_text(self, prompt: str, max_tokens: int = DEFAULT_MAX_TOKENS) -> str:
         """Generate text from a prompt. To be implemented by subclasses."""
-        raise NotImplementedError("Subclasses must implement generate_text")
+        raise NotImplementedError("Subclasses must implement _generate_text")
+    
+    def generate_text_stream(self, prompt: str, action: Optional[str] = None) -> Iterator[str]:
+        """Generate text from a prompt, yielding chunks as they are produced."""
+        max_tokens = self._max_tokens(action)
+        if not self._use_cache():
+            yield from self._generate_text_stream(prompt, max_tokens)
+            return
+        
+        key = self._cache_key(prompt, max_tokens)
+        try:
+            cached = self._get_cache().get(key)
+        except Exception:
+            cached = None
+        if cached is not None:
+            yield cached
+            return
+        
+        parts = []
+        failed = False
+        for chunk in self._generate_text_stream(prompt, max_tokens):
+            parts.append(chunk)
+            failed = failed or isinstance(chunk, StreamError)
+            yield chunk
+        # A stream that broke off partway is not an answer, even though it doesn't start with "Error"
+        if not failed:
+            self._store_cached(key, "".join(parts))
+    
+    def _generate_text_stream(self, prompt: str, max_tokens: int = DEFAULT_MAX_TOKENS) -> Iterator[str]:
+        """Stream generated text. Providers without streaming yield it in one piece."""
+        result = self._generate_text(prompt, max_tokens)
+        yield StreamError(result) if result.startswith("Error") else result
+    
+    def _use_cache(self) -> bool:
+        """Only deterministic requests are cached unless cache_all is set."""
+        return self.cache_enabled and (self.temperature == 0 or self.cache_all)
+    
+    def _cache_key(self, prompt: str, max_tokens: int = DEFAULT_MAX_TOKENS) -> str:
+        from numen.ai.cache import make_key
+        return make_key(
+            type(self).__name__,
+            self.config.get("default_model", ""),
+            self.temperature,
+            prompt,
+            system=SYSTEM_PROMPT,
+            max_tokens=max_tokens,
+        )
+    
+    def _get_cache(self) -> "DiskCache":
+        if self._cache is None:
+            from numen.ai.cache import DiskCache
+            self._cache = DiskCache()
+        return self._cache
+    
+    def _cached_generate(self, prompt: str, generate: Callable[[str, int], str], max_tokens: int) -> str:
+        """Look prompt up in the response cache, calling generate on a miss."""
+        if not self._use_cache():
+            return generate(prompt, max_tokens)
+        
+        key = self._cache_key(prompt, max_tokens)
+        try:
+            cached = self._get_cache().get(key)
+        except Exception:
+            cached = None
+        if cached is not None:
+            return cached
+        
+        result = generate(prompt, max_tokens)
+        self._store_cached(key, result)
+        return result
+    
+    def prepare_request(self, action: str, text: str) -> Tuple[str, int]:
+        """Return the prompt and output token budget of a request to run action on text."""
+        return self._build_prompt(action, text)[1], self._max_tokens(action)
+    
+    def cached_response(self, prompt: str, max_tokens: int) -> Optional[str]:
+        """Return the cached response to a request, or None on a miss or when caching is off."""
+        if not self._use_cache():
+            return None
+        try:
+            return self._get_cache().get(self._cache_key(prompt, max_tokens))
+        except Exception:
+            return None
+    
+    def cache_response(self, prompt: str, max_tokens: int, result: str) -> None:
+        """Store the response to a request, unless caching is off or it is an error."""
+        if self._use_cache():
+            self._store_cached(self._cache_key(prompt, max_tokens), result)
+    
+    def _store_cached(self, key: str, result: str) -> None:
+        # Error messages are returned as text; never cache them
+        if result.startswith("Error"):
+            return
+        try:
+            self._get_cache().set(key, result, ttl=self.cache_ttl)
+        except Exception as e:
+            _console().print(f"[yellow]Warning: Unable to cache AI response: {e}[/yellow]")
+    
+    async def aexpand(self, text: str) -> str:
+        """Expand the given text asynchronously."""
+        optimized_text, prompt = self._build_prompt("expand", text)
+        return await self._asemantic_generate("expand", optimized_text, prompt)
+    
+    async def asummarize(self, text: str) -> str:
+        """Summarize the given text asynchronously."""
+        optimized_text, prompt = self._build_prompt("summarize", text)
+        return await self._asemantic_generate("summarize", optimized_text, prompt)
+    
+    async def apoetic(self, text: str) -> str:
+        """Transform the given text into poetry asynchronously."""
+        optimized_text, prompt = self._build_prompt("poetic", text)
+        return await self._asemantic_generate("poetic", optimized_text, prompt)
+    
+    async def agenerate_text(self, prompt: str, action: Optional[str] = None) -> str:
+        """Generate text from a prompt without blocking the event loop."""
+        max_tokens = self._max_tokens(action)
+        if not self._use_cache():
+            return await self._agenerate_text(prompt, max_tokens)
+        
+        key = self._cache_key(prompt, max_tokens)
+        try:
+            cached = self._get_cache().get(key)
+        except Exception:
+            cached = None
+        if cached is not None:
+            return cached
+        
+        result = await self._agenerate_text(prompt, max_tokens)
+        self._store_cached(key, result)
+        return result
+    
+    async def _agenerate_text(self, prompt: str, max_tokens: int = DEFAULT_MAX_TOKENS) -> str:
+        """Generate text asynchronously.
+        
+        Providers with a native async client override this; the default
+        runs the blocking call in a worker thread.
+        """
+        return await asyncio.to_thread(self._generate_text, prompt, max_tokens)
+    
+    def close(self) -> None:
+        """Release any resources held by the provider."""
+        pass
+    
+    async def aclose(self) -> None:
+        """Release any async resources held by the provider."""
+        pass
 
 
 class AnthropicProvider(AIProvider):
     """Provider for Anthropic Claude."""
     
+    _sdk_name = "anthropic"
+    _provider_name = "anthropic"
+    
     def __init__(self) -> None:
         super().__init__()
-        if not AVAILABLE_PROVIDERS["anthropic"]:
-            console.print("[red]Error: Anthropic library is not installed. Run 'pip install numen[anthropic]' to add support.")
+        if not available_providers()["anthropic"]:
+            _console().print("[red]Error: Anthropic library is not installed. Run 'pip install numen[anthropic]' to add support.")
             raise ImportError("Anthropic library not installed")
             
         api_key = self.config.get("anthropic_api_key", "")
         if not api_key:
-            console.print("[red]Error: Anthropic API key is missing. Run 'numen config' to add your API key.")
-        import anthropic  # Import here to avoid global import errors
-        self.client = anthropic.Anthropic(api_key=api_key)
+            _console().print("[red]Error: Anthropic API key is missing. Run 'numen config' to add your API key.")
+        anthropic = self._import_sdk()
+        # Retries are handled by retry_call so they are not stacked with the SDK's own
+        self.client = anthropic.Anthropic(api_key=api_key, max_retries=0)
+        self.api_key = api_key
+        self._aclient: Any = None
     
-    def generate_text(self, prompt: str) -> str:
+    def _model_name(self) -> str:
+        model: str = self.config.get("default_model", "claude-3-sonnet-20240229")
+        if "claude" not in model.lower():
+            model = "claude-3-sonnet-20240229"
+        return model
+    
+    def request_args(self, prompt: str, max_tokens: int = DEFAULT_MAX_TOKENS) -> Dict:
+        """Build the keyword arguments for a messages.create call."""
+        return {
+            "model": self._model_name(),
+            "max_tokens": max_tokens,
+            "temperature": self.config.get("temperature", 0.7),
+            "system": [
+                {"type": "text", "text": SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}}
+            ],
+            "messages": [
+                {"role": "user", "content": prompt}
+            ],
+        }
+    
+    def _retryable_errors(self) -> tuple:
+        anthropic = self._import_sdk()
+        return (anthropic.RateLimitError, anthropic.InternalServerError, anthropic.APIConnectionError)
+    
+    def _handle_error(self, e: Exception) -> str:
+        """Map an Anthropic exception to a user-facing error string."""
+        anthropic = self._import_sdk()
+        if isinstance(e, anthropic.AuthenticationError):
+            return "Error: Invalid Anthropic API key. Please check your API key in 'numen config'."
+        elif isinstance(e, anthropic.RateLimitError):
+            return "Error: Rate limit exceeded. Please try again later."
+        else:
+            _report_error(f"Error generating text with Anthropic: {e}")
+            return f"Error: {str(e)}"
+    
+    def _generate_text(self, prompt: str, max_tokens: int = DEFAULT_MAX_TOKENS) -> str:
         """Generate text using Anthropic Claude."""
         if not self.config.get("anthropic_api_key"):
             return "Error: Anthropic API key is missing. Run 'numen config' to add your API key."
             
         try:
-            message = self.client.messages.create(
-                model=self.config.get("default_model", "claude-3-sonnet-20240229"),
-                max_tokens=1024,
-                temperature=self.config.get("temperature", 0.7),
-                system="You are a helpful writing assistant that helps expand, summarize, or transform text.",
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
-            )
+            message = retry_call(self.client.messages.create, self._retryable_errors(), **self.request_args(prompt, max_tokens))
             return message.content[0].text
         except Exception as e:
-            error_msg = str(e)
-            if "401" in error_msg:
-                return "Error: Invalid Anthropic API key. Please check your API key in 'numen config'."
-            elif "429" in error_msg:
-                return "Error: Rate limit exceeded. Please try again later."
-            else:
-                console.print(f"[red]Error generating text with Anthropic: {e}")
-                return f"Error: {error_msg}"
+            return self._handle_error(e)
+    
+    def _generate_text_stream(self, prompt: str, max_tokens: int = DEFAULT_MAX_TOKENS) -> Iterator[str]:
+        """Stream text from Anthropic Claude as it is generated."""
+        if not self.config.get("anthropic_api_key"):
+            yield StreamError("Error: Anthropic API key is missing. Run 'numen config' to add your API key.")
+            return
+        
+        try:
+            with self.client.messages.stream(**self.request_args(prompt, max_tokens)) as stream:
+                yield from stream.text_stream
+        except Exception as e:
+            yield StreamError(self._handle_error(e))
+    
+    async def _agenerate_text(self, prompt: str, max_tokens: int = DEFAULT_MAX_TOKENS) -> str:
+        """Generate text using Anthropic Claude's async client."""
+        if not self.config.get("anthropic_api_key"):
+            return "Error: Anthropic API key is missing. Run 'numen config' to add your API key."
+            
+        try:
+            if self._aclient is None:
+                anthropic = self._import_sdk()
+                self._aclient = anthropic.AsyncAnthropic(api_key=self.api_key, max_retries=0)
+            message = await aretry_call(self._aclient.messages.create, self._retryable_errors(), **self.request_args(prompt, max_tokens))
+            return str(message.content[0].text)
+        except Exception as e:
+            return self._handle_error(e)
+    
+    async def aclose(self) -> None:
+        """Close the async HTTP client, if one was opened."""
+        if self._aclient is not None:
+            await self._aclient.close()
+            self._aclient = None
 
 
 class OpenAIProvider(AIProvider):
     """Provider for OpenAI GPT models."""
     
+    _sdk_name = "openai"
+    _provider_name = "openai"
+    
     def __init__(self) -> None:
         super().__init__()
-        if not AVAILABLE_PROVIDERS["openai"]:
-            console.print("[red]Error: OpenAI library is not installed. Run 'pip install numen[openai]' to add support.")
+        if not available_providers()["openai"]:
+            _console().print("[red]Error: OpenAI library is not installed. Run 'pip install numen[openai]' to add support.")
             raise ImportError("OpenAI library not installed")
             
         api_key = self.config.get("openai_api_key", "")
         if not api_key:
-            console.print("[red]Error: OpenAI API key is missing. Run 'numen config' to add your API key.")
-        import openai  # Import here to avoid global import errors
-        self.client = openai.OpenAI(api_key=api_key)
+            _console().print("[red]Error: OpenAI API key is missing. Run 'numen config' to add your API key.")
+        openai = self._import_sdk()
+        # Retries are handled by retry_call so they are not stacked with the SDK's own
+        self.client = openai.OpenAI(api_key=api_key, max_retries=0)
+        self.api_key = api_key
+        self._aclient: Any = None
     
-    def generate_text(self, prompt: str) -> str:
+    def _model_name(self) -> str:
+        model: str = self.config.get("default_model", "gpt-4-turbo")
+        if "gpt" not in model.lower():
+            model = "gpt-4-turbo"
+        return model
+    
+    def request_args(self, prompt: str, max_tokens: int = DEFAULT_MAX_TOKENS) -> Dict:
+        """Build the keyword arguments for a chat.completions.create call."""
+        return {
+            "model": self._model_name(),
+            "messages": [
+                {"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": prompt}
+            ],
+            "temperature": self.config.get("temperature", 0.7),
+            "max_tokens": max_tokens,
+        }
+    
+    def _retryable_errors(self) -> tuple:
+        openai = self._import_sdk()
+        return (openai.RateLimitError, openai.InternalServerError, openai.APIConnectionError)
+    
+    def _handle_error(self, e: Exception) -> str:
+        """Map an OpenAI exception to a user-facing error string."""
+        openai = self._import_sdk()
+        if isinstance(e, openai.AuthenticationError):
+            return "Error: Invalid OpenAI API key. Please check your API key in 'numen config'."
+        elif isinstance(e, openai.RateLimitError):
+            return "Error: Rate limit exceeded. Please try again later."
+        else:
+            _report_error(f"Error generating text with OpenAI: {e}")
+            return f"Error: {str(e)}"
+    
+    def _generate_text(self, prompt: str, max_tokens: int = DEFAULT_MAX_TOKENS) -> str:
         """Generate text using OpenAI GPT."""
         if not self.config.get("openai_api_key"):
             return "Error: OpenAI API key is missing. Run 'numen config' to add your API key."
             
         try:
-            model = self.config.get("default_model", "gpt-4-turbo")
-            if "gpt" not in model.lower():
-                model = "gpt-4-turbo"
-                
-            response = self.client.chat.completions.create(
-                model=model,
-                messages=[
-                    {"role": "system", "content": "You are a helpful writing assistant that helps expand, summarize, or transform text."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=self.config.get("temperature", 0.7),
-                max_tokens=1024
-            )
+            response = retry_call(self.client.chat.completions.create, self._retryable_errors(), **self.request_args(prompt, max_tokens))
             return response.choices[0].message.content
         except Exception as e:
-            error_msg = str(e)
-            if "401" in error_msg or "authentication" in error_msg.lower():
-                return "Error: Invalid OpenAI API key. Please check your API key in 'numen config'."
-            elif "429" in error_msg or "rate limit" in error_msg.lower():
-                return "Error: Rate limit exceeded. Please try again later."
-            else:
-                console.print(f"[red]Error generating text with OpenAI: {e}")
-                return f"Error: {error_msg}"
+            return self._handle_error(e)
+    
+    def _generate_text_stream(self, prompt: str, max_tokens: int = DEFAULT_MAX_TOKENS) -> Iterator[str]:
+        """Stream text from OpenAI GPT as it is generated."""
+        if not self.config.get("openai_api_key"):
+            yield StreamError("Error: OpenAI API key is missing. Run 'numen config' to add your API key.")
+            return
+        
+        try:
+            stream = self.client.chat.completions.create(stream=True, **self.request_args(prompt, max_tokens))
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        except Exception as e:
+            yield StreamError(self._handle_error(e))
+    
+    async def _agenerate_text(self, prompt: str, max_tokens: int = DEFAULT_MAX_TOKENS) -> str:
+        """Generate text using OpenAI GPT's async client."""
+        if not self.config.get("openai_api_key"):
+            return "Error: OpenAI API key is missing. Run 'numen config' to add your API key."
+            
+        try:
+            if self._aclient is None:
+                openai = self._import_sdk()
+                self._aclient = openai.AsyncOpenAI(api_key=self.api_key, max_retries=0)
+            response = await aretry_call(self._aclient.chat.completions.create, self._retryable_errors(), **self.request_args(prompt, max_tokens))
+            return str(response.choices[0].message.content or "")
+        except Exception as e:
+            return self._handle_error(e)
+    
+    async def aclose(self) -> None:
+        """Close the async HTTP client, if one was opened."""
+        if self._aclient is not None:
+            await self._aclient.close()
+            self._aclient = None
 
 
 class OllamaProvider(AIProvider):
     """Provider for Ollama local LLMs."""
     
+    _provider_name = "ollama"
+    
     def __init__(self) -> None:
         super().__init__()
         self.base_url = self.config.get("ollama_base_url", "http://localhost:11434")
+        self._aclient: Any = None
+        
+        # Keep one pooled keep-alive client so repeated calls skip the TCP handshake.
+        # With httpx installed this is an HTTP/2 client that multiplexes concurrent
+        # requests over a single connection; otherwise fall back to requests.
+        self._use_httpx = _has("httpx")
+        self._http2 = self._use_httpx and _has("h2")
+        if self._use_httpx:
+            import httpx  # Import here to avoid global import errors
+            self._client = httpx.Client(http2=self._http2, **self._httpx_options())
+        else:
+            import requests  # Import here to ensure requests is available
+            from requests.adapters import HTTPAdapter
+            
+            self._client = requests.Session()
+            adapter = HTTPAdapter(pool_connections=10, pool_maxsize=10, max_retries=0)
+            self._client.mount("http://", adapter)
+            self._client.mount("https://", adapter)
+            self._client.headers.update({
+                "Connection": "keep-alive",
+                "Accept-Encoding": "gzip, deflate",
+                "Content-Type": "application/json",
+            })
+    
+    @staticmethod
+    def _httpx_options() -> Dict:
+        """Timeouts and pool limits shared by the sync and async httpx clients."""
+        import httpx  # Import here to avoid global import errors
+        return {
+            "timeout": httpx.Timeout(300.0, connect=10.0),
+            "limits": httpx.Limits(max_keepalive_connections=40, max_connections=100, keepalive_expiry=30.0),
+            "headers": {"Content-Type": "application/json"},
+        }
+    
+    def _model_name(self) -> str:
+        model: str = self.config.get("default_model", "llama3")
+        if "claude" in model.lower() or "gpt" in model.lower():
+            model = "llama3"
+        return model
     
-    def generate_text(self, prompt: str) -> str:
+    def _payload(self, prompt: str, max_tokens: int = DEFAULT_MAX_TOKENS) -> Dict:
+        """Build the JSON body for the /api/generate endpoint."""
+        return {
+            "model": self._model_name(),
+            "system": SYSTEM_PROMPT,
+            "prompt": prompt,
+            "options": {
+                "temperature": self.config.get("temperature", 0.7),
+                "num_predict": max_tokens,
+            },
+            "stream": False
+        }
+    
+    def _generate_text(self, prompt: str, max_tokens: int = DEFAULT_MAX_TOKENS) -> str:
         """Generate text using Ollama."""
         try:
-            import requests  # Import here to ensure requests is available
-            model = self.config.get("default_model", "llama3")
-            if "claude" in model.lower() or "gpt" in model.lower():
-                model = "llama3"
-                
-            data = {
-                "model": model,
-                "prompt": f"You are a helpful writing assistant that helps expand, summarize, or transform text.\n\n{prompt}",
-                "temperature": self.config.get("temperature", 0.7),
-                "stream": False
-            }
+            body = json_dumps(self._payload(prompt, max_tokens))
+            
+            if self._use_httpx:
+                response = self._client.post(f"{self.base_url}/api/generate", content=body)
+            else:
+                response = self._client.post(
+                    f"{self.base_url}/api/generate",
+                    data=body,
+                    timeout=(10, 300)
+                )
             
-            response = requests.post(
+            if response.status_code == 200:
+                result = json_loads(response.content)
+                return result.get("response", "Error: No response from Ollama")
+            else:
+                _report_error(f"Error generating text with Ollama: {response.status_code}")
+                return f"Error: HTTP {response.status_code}"
+        except Exception as e:
+            _report_error(f"Error generating text with Ollama: {e}")
+            return f"Error: {str(e)}"
+    
+    def _generate_text_stream(self, prompt: str, max_tokens: int = DEFAULT_MAX_TOKENS) -> Iterator[str]:
+        """Stream text from Ollama, one JSON line per generated chunk."""
+        url = f"{self.base_url}/api/generate"
+        body = json_dumps(dict(self._payload(prompt, max_tokens), stream=True))
+        
+        try:
+            if self._use_httpx:
+                with self._client.stream("POST", url, content=body) as response:
+                    yield from self._iter_stream(response.status_code, response.iter_lines())
+            else:
+                with self._client.post(url, data=body, stream=True, timeout=(10, 300)) as response:
+                    yield from self._iter_stream(response.status_code, response.iter_lines())
+        except Exception as e:
+            _report_error(f"Error generating text with Ollama: {e}")
+            yield StreamError(f"Error: {str(e)}")
+    
+    def _iter_stream(self, status_code: int, lines: Iterable[Union[str, bytes]]) -> Iterator[str]:
+        if status_code != 200:
+            _report_error(f"Error generating text with Ollama: {status_code}")
+            yield StreamError(f"Error: HTTP {status_code}")
+            return
+        
+        for line in lines:
+            if not line:
+                continue
+            chunk = json_loads(line)
+            if chunk.get("response"):
+                yield chunk["response"]
+            if chunk.get("done"):
+                break
+    
+    async def _agenerate_text(self, prompt: str, max_tokens: int = DEFAULT_MAX_TOKENS) -> str:
+        """Generate text using Ollama over a pooled async HTTP client."""
+        if not self._use_httpx:
+            return await super()._agenerate_text(prompt, max_tokens)
+        
+        try:
+            if self._aclient is None:
+                import httpx  # Import here to avoid global import errors
+                self._aclient = httpx.AsyncClient(http2=self._http2, **self._httpx_options())
+            
+            response = await self._aclient.post(
                 f"{self.base_url}/api/generate",
-                json=data
+                content=json_dumps(self._payload(prompt, max_tokens))
             )
             
             if response.status_code == 200:
-                result = response.json()
-                return result.get("response", "Error: No response from Ollama")
+                result = json_loads(response.content)
+                return str(result.get("response", "Error: No response from Ollama"))
             else:
-                console.print(f"[red]Error generating text with Ollama: {response.status_code}")
+                _report_error(f"Error generating text with Ollama: {response.status_code}")
                 return f"Error: HTTP {response.status_code}"
         except Exception as e:
-            console.print(f"[red]Error generating text with Ollama: {e}")
+            _report_error(f"Error generating text with Ollama: {e}")
             return f"Error: {str(e)}"
+    
+    def close(self) -> None:
+        """Close the pooled HTTP client."""
+        self._client.close()
+    
+    def __del__(self) -> None:
+        client = getattr(self, "_client", None)
+        if client is not None:
+            client.close()
+    
+    async def aclose(self) -> None:
+        """Close the async HTTP client, if one was opened."""
+        if self._aclient is not None:
+            await self._aclient.aclose()
+            self._aclient = None
 
 
 class GeminiProvider(AIProvider):
     """Provider for Google's Gemini AI."""
     
+    _sdk_name = "google.generativeai"
+    _provider_name = "gemini"
+    
     def __init__(self) -> None:
         super().__init__()
-        if not AVAILABLE_PROVIDERS["gemini"]:
-            console.print("[red]Error: Google Generative AI library is not installed. Run 'pip install numen[gemini]' to add support.")
+        if not available_providers()["gemini"]:
+            _console().print("[red]Error: Google Generative AI library is not installed. Run 'pip install numen[gemini]' to add support.")
             raise ImportError("Google Generative AI library not installed")
             
         api_key = self.config.get("gemini_api_key", "")
         if not api_key:
-            console.print("[red]Error: Gemini API key is missing. Run 'numen config' to add your API key.")
+            _console().print("[red]Error: Gemini API key is missing. Run 'numen config' to add your API key.")
             
         try:
-            import google.generativeai as genai  # Import here to avoid global import errors
+            genai = self._import_sdk()
             genai.configure(api_key=api_key)
         except Exception as e:
-            console.print(f"[red]Error configuring Gemini: {e}")
+            _console().print(f"[red]Error configuring Gemini: {e}")
     
-    def generate_text(self, prompt: str) -> str:
-        """Generate text using Google's Gemini AI."""
-        import google.generativeai as genai  # Import here to avoid global import errors
+    def _model_name(self) -> str:
+        model: str = self.config.get("default_model", "gemini-1.5-pro")
+        if "gemini" not in model.lower():
+            model = "gemini-1.5-pro"
+        return model
+    
+    def _model(self, max_tokens: int = DEFAULT_MAX_TOKENS) -> Tuple[Any, Any]:
+        """Build the Gemini model and its generation config."""
+        genai = self._import_sdk()
         
+        generation_config = genai.types.GenerationConfig(
+            temperature=self.config.get("temperature", 0.7),
+            max_output_tokens=max_tokens,
+        )
+        return genai.GenerativeModel(self._model_name(), system_instruction=SYSTEM_PROMPT), generation_config
+    
+    @staticmethod
+    def _api_errors() -> ModuleType:
+        """Return google.api_core.exceptions, which the Gemini SDK raises."""
+        return importlib.import_module("google.api_core.exceptions")
+    
+    def _retryable_errors(self) -> tuple:
+        errors = self._api_errors()
+        return (errors.ResourceExhausted, errors.ServiceUnavailable, errors.InternalServerError)
+    
+    def _handle_error(self, e: Exception) -> str:
+        """Map a Gemini exception to a user-facing error string."""
+        errors = self._api_errors()
+        # An invalid key is reported as InvalidArgument ("API key not valid")
+        if isinstance(e, (errors.PermissionDenied, errors.Unauthenticated)) or (
+            isinstance(e, errors.InvalidArgument) and "API key" in e.message
+        ):
+            return "Error: Invalid Gemini API key. Please check your API key in 'numen config'."
+        elif isinstance(e, errors.ResourceExhausted):
+            return "Error: Rate limit or quota exceeded. Please try again later."
+        else:
+            _report_error(f"Error generating text with Gemini: {e}")
+            return f"Error: {str(e)}"
+    
+    def _generate_text(self, prompt: str, max_tokens: int = DEFAULT_MAX_TOKENS) -> str:
+        """Generate text using Google's Gemini AI."""
         try:
-            model_name = self.config.get("default_model", "gemini-1.5-pro")
-            if "gemini" not in model_name.lower():
-                model_name = "gemini-1.5-pro"
-            
-            model = genai.GenerativeModel(model_name)
-            
-            response = model.generate_content(
-                prompt,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=self.config.get("temperature", 0.7),
-                    max_output_tokens=1024,
-                )
-            )
-            
+            model, generation_config = self._model(max_tokens)
+            response = retry_call(model.generate_content, self._retryable_errors(), prompt, generation_config=generation_config)
             return response.text
         except Exception as e:
-            error_msg = str(e)
-            if "403" in error_msg or "api key" in error_msg.lower():
-                return "Error: Invalid Gemini API key. Please check your API key in 'numen config'."
-            elif "429" in error_msg or "quota" in error_msg.lower():
-                return "Error: Rate limit or quota exceeded. Please try again later."
-            else:
-                console.print(f"[red]Error generating text with Gemini: {e}")
-                return f"Error: {error_msg}"
+            return self._handle_error(e)
+    
+    def _generate_text_stream(self, prompt: str, max_tokens: int = DEFAULT_MAX_TOKENS) -> Iterator[str]:
+        """Stream text from Google's Gemini AI as it is generated."""
+        try:
+            model, generation_config = self._model(max_tokens)
+            response = model.generate_content(prompt, generation_config=generation_config, stream=True)
+            for chunk in response:
+                yield chunk.text
+        except Exception as e:
+            yield StreamError(self._handle_error(e))
+    
+    async def _agenerate_text(self, prompt: str, max_tokens: int = DEFAULT_MAX_TOKENS) -> str:
+        """Generate text using Google's Gemini AI asynchronously."""
+        try:
+            model, generation_config = self._model(max_tokens)
+            response = await aretry_call(model.generate_content_async, self._retryable_errors(), prompt, generation_config=generation_config)
+            return str(response.text)
+        except Exception as e:
+            return self._handle_error(e)
+
+
+# The shared provider and the settings it was built from
+_provider: Optional[AIProvider] = None
+_provider_fingerprint: Optional[str] = None
+_provider_config: Optional[Dict] = None
 
 
 def get_ai_provider() -> AIProvider:
-    """Get the configured AI provider."""
+    """Get the configured AI provider.
+    
+    One provider is shared for as long as the AI settings stay the same, so
+    its SDK clients and connection pools survive across calls.
+    """
+    global _provider, _provider_fingerprint, _provider_config
+    
     config = get_ai_config()
-    provider_name = config.get("default_provider", "ollama").lower()
+    # get_ai_config is memoized, so the same object means the same settings; skip hashing them
+    if _provider is not None and config is _provider_config:
+        return _provider
+    
+    fingerprint = hashlib.sha256(json.dumps(config, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+    if _provider is None or fingerprint != _provider_fingerprint:
+        reset_ai_provider()
+        _provider = _build_provider(config.get("default_provider", "ollama").lower())
+        _provider_fingerprint = fingerprint
+    _provider_config = config
+    return _provider
+
+
+def reset_ai_provider() -> None:
+    """Close the shared provider so the next call builds a fresh one."""
+    global _provider, _provider_fingerprint, _provider_config
+    
+    if _provider is not None:
+        try:
+            _provider.close()
+        except Exception:
+            pass
+    _provider = None
+    _provider_fingerprint = None
+    _provider_config = None
+
+
+def _build_provider(provider_name: str) -> AIProvider:
+    """Instantiate the provider for provider_name, falling back if unavailable."""
+    available = available_providers()
     
     # Check for the requested provider
     try:
-        if provider_name == "anthropic" and AVAILABLE_PROVIDERS["anthropic"]:
+        if provider_name == "anthropic" and available["anthropic"]:
             return AnthropicProvider()
-        elif provider_name == "openai" and AVAILABLE_PROVIDERS["openai"]:
+        elif provider_name == "openai" and available["openai"]:
             return OpenAIProvider()
-        elif provider_name == "gemini" and AVAILABLE_PROVIDERS["gemini"]:
+        elif provider_name == "gemini" and available["gemini"]:
             return GeminiProvider()
         elif provider_name == "ollama":
             return OllamaProvider()
         
         # Fall back to any available provider in this priority order
-        if AVAILABLE_PROVIDERS["anthropic"]:
-            console.print(f"[yellow]Provider '{provider_name}' is not available, falling back to Anthropic.[/yellow]")
+        if available["anthropic"]:
+            _console().print(f"[yellow]Provider '{provider_name}' is not available, falling back to Anthropic.[/yellow]")
             return AnthropicProvider()
-        elif AVAILABLE_PROVIDERS["openai"]:
-            console.print(f"[yellow]Provider '{provider_name}' is not available, falling back to OpenAI.[/yellow]")
+        elif available["openai"]:
+            _console().print(f"[yellow]Provider '{provider_name}' is not available, falling back to OpenAI.[/yellow]")
             return OpenAIProvider()
-        elif AVAILABLE_PROVIDERS["gemini"]:
-            console.print(f"[yellow]Provider '{provider_name}' is not available, falling back to Gemini.[/yellow]")
+        elif available["gemini"]:
+            _console().print(f"[yellow]Provider '{provider_name}' is not available, falling back to Gemini.[/yellow]")
             return GeminiProvider()
         else:
-            console.print(f"[yellow]Provider '{provider_name}' is not available, falling back to Ollama.[/yellow]")
+            _console().print(f"[yellow]Provider '{provider_name}' is not available, falling back to Ollama.[/yellow]")
             return OllamaProvider()
     except ImportError:
-        console.print(f"[yellow]Provider '{provider_name}' is not installed, falling back to Ollama.[/yellow]")
+        _console().print(f"[yellow]Provider '{provider_name}' is not installed, falling back to Ollama.[/yellow]")
         return OllamaProvider()
 
 
+DEPENDENCY_HINT = "If this is a dependency issue, you can install the required providers with:\n- pip install numen[anthropic] - for Claude (requires Rust)\n- pip install numen[openai] - for GPT (requires Rust)\n- pip install numen[gemini] - for Gemini\n- pip install numen[all-ai] - for all providers"
+
+ACTIONS = ("expand", "summarize", "poetic")
+
+
 def process_text(action: str, text: str) -> str:
     """Process text with the configured AI provider."""
     try:
+        if action in ACTIONS and get_ai_config().get("race_providers", False):
+            return process_text_fastest(action, text)
+        
         provider = get_ai_provider()
         
         if action == "expand":
@@ -308,4 +954,115 @@ def process_text(action: str, text: str) -> str:
         else:
             return f"Unknown action: {action}"
     except Exception as e:
-        return f"Error processing text: {str(e)}\n\nIf this is a dependency issue, you can install the required providers with:\n- pip install numen[anthropic] - for Claude (requires Rust)\n- pip install numen[openai] - for GPT (requires Rust)\n- pip install numen[gemini] - for Gemini\n- pip install numen[all-ai] - for all providers"
+        return f"Error processing text: {str(e)}\n\n{DEPENDENCY_HINT}"
+
+
+def process_text_stream(action: str, text: str) -> Iterator[str]:
+    """Process text with the configured AI provider, yielding output as it arrives."""
+    if action not in ACTIONS:
+        yield f"Unknown action: {action}"
+        return
+    
+    try:
+        provider = get_ai_provider()
+        yield from provider.stream(action, text)
+    except Exception as e:
+        yield f"Error processing text: {str(e)}\n\n{DEPENDENCY_HINT}"
+
+
+def _enabled_providers() -> List[AIProvider]:
+    """Build every provider that is installed and has credentials configured."""
+    config = get_ai_config()
+    available = available_providers()
+    candidates = (
+        ("anthropic", AnthropicProvider, "anthropic_api_key"),
+        ("openai", OpenAIProvider, "openai_api_key"),
+        ("gemini", GeminiProvider, "gemini_api_key"),
+        ("ollama", OllamaProvider, None),
+    )
+    
+    providers: List[AIProvider] = []
+    for name, provider_class, key in candidates:
+        if available[name] and (key is None or config.get(key)):
+            try:
+                providers.append(provider_class())
+            except ImportError:
+                pass
+    return providers
+
+
+async def _race_providers(providers: List[AIProvider], action: str, text: str) -> str:
+    """Return the first successful answer and cancel the slower requests."""
+    tasks = [asyncio.create_task(getattr(provider, f"a{action}")(text)) for provider in providers]
+    first_error = None
+    try:
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is not None:
+                    first_error = first_error or f"Error processing text: {task.exception()}"
+                    continue
+                result: str = task.result()
+                # A fast failure (e.g. Ollama not running) must not win the race
+                if not result.startswith("Error"):
+                    return result
+                first_error = first_error or result
+        return first_error or "Error: No AI provider is configured"
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for provider in providers:
+            await provider.aclose()
+            provider.close()
+
+
+def process_text_fastest(action: str, text: str) -> str:
+    """Send text to every configured provider and return the first good answer.
+    
+    Latency becomes that of the fastest provider. Enable it for the AI
+    commands with race_providers = true in the [ai] config section.
+    """
+    if action not in ACTIONS:
+        return f"Unknown action: {action}"
+    
+    try:
+        providers = _enabled_providers()
+        return asyncio.run(_race_providers(providers, action, text))
+    except Exception as e:
+        return f"Error processing text: {str(e)}\n\n{DEPENDENCY_HINT}"
+
+
+async def _process_texts_async(provider: AIProvider, action: str, texts: List[str]) -> List[str]:
+    """Run one action over many texts concurrently on a single provider."""
+    handler = getattr(provider, f"a{action}")
+    try:
+        results = await asyncio.gather(*(handler(text) for text in texts), return_exceptions=True)
+    finally:
+        await provider.aclose()
+    
+    return [
+        f"Error processing text: {result}" if isinstance(result, BaseException) else result
+        for result in results
+    ]
+
+
+def process_texts(action: str, texts: List[str]) -> List[str]:
+    """Process several texts concurrently with the configured AI provider.
+    
+    Requests are issued in parallel, so the total latency is roughly that of
+    the slowest request rather than the sum of all of them. Results are
+    returned in the same order as the input texts.
+    """
+    if action not in ACTIONS:
+        return [f"Unknown action: {action}" for _ in texts]
+    if not texts:
+        return []
+    
+    try:
+        provider = get_ai_provider()
+        return asyncio.run(_process_texts_async(provider, action, texts))
+    except Exception as e:
+        error = f"Error processing text: {str(e)}\n\n{DEPENDENCY_HINT}"
+        return [error for _ in texts]
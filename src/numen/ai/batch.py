@@ -0,0 +1,183 @@
+"""Batch API support for running one action over many texts.
+
+OpenAI's Batch API and Anthropic's Message Batches process requests
+asynchronously at about half the price of interactive calls. Results can
+take minutes to hours, so this is meant for bulk jobs rather than the
+interactive commands.
+"""
+
+import functools
+import json
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from numen.ai import (
+    ACTIONS,
+    AIProvider,
+    AnthropicProvider,
+    OpenAIProvider,
+    _console,
+    get_ai_provider,
+    process_texts,
+)
+
+POLL_INTERVAL = 30.0
+MISSING_RESULT = "Error: No result returned for this text"
+
+# Runs prompts keyed by custom_id as one batch: (prompts, max_tokens, poll_interval) -> answers
+BatchRunner = Callable[[Dict[str, str], int, float], Dict[str, str]]
+
+
+def process_texts_bulk(
+    action: str, texts: List[str], poll_interval: float = POLL_INTERVAL
+) -> List[str]:
+    """Run one action over many texts through the provider's batch API.
+
+    Results are returned in the order of texts. Providers without a batch
+    API fall back to concurrent requests via process_texts.
+    """
+    if action not in ACTIONS:
+        return [f"Unknown action: {action}"] * len(texts)
+    if not texts:
+        return []
+
+    provider = get_ai_provider()
+    run_batch = _batch_runner(provider)
+    if run_batch is None:
+        return process_texts(action, texts)
+
+    requests = [provider.prepare_request(action, text) for text in texts]
+    max_tokens = requests[0][1]
+    prompts = [prompt for prompt, _ in requests]
+
+    # Only send prompts whose answers are not cached already
+    results: List[Optional[str]] = [
+        provider.cached_response(prompt, max_tokens) for prompt in prompts
+    ]
+    pending = {str(i): prompt for i, prompt in enumerate(prompts) if results[i] is None}
+    if pending:
+        try:
+            answers = run_batch(pending, max_tokens, poll_interval)
+        except Exception as e:
+            _console().print(f"[red]Error running batch: {e}")
+            answers = {}
+
+        for custom_id, prompt in pending.items():
+            answer = answers.get(custom_id, MISSING_RESULT)
+            results[int(custom_id)] = answer
+            provider.cache_response(prompt, max_tokens, answer)
+
+    return [result if result is not None else MISSING_RESULT for result in results]
+
+
+def _batch_runner(provider: AIProvider) -> Optional[BatchRunner]:
+    """Return a function that runs prompts as a batch on provider, or None if it has no batch API."""
+    if isinstance(provider, OpenAIProvider):
+        return functools.partial(_run_openai_batch, provider)
+    if isinstance(provider, AnthropicProvider):
+        batches = _anthropic_batches(provider)
+        if batches is not None:
+            return functools.partial(_run_anthropic_batch, provider, batches)
+    return None
+
+
+def _wait(poll_interval: float, status: str) -> None:
+    _console().print(
+        f"[blue]Batch status: {status}. Checking again in {poll_interval:.0f}s...[/blue]"
+    )
+    time.sleep(poll_interval)
+
+
+def _run_openai_batch(
+    provider: OpenAIProvider,
+    prompts: Dict[str, str],
+    max_tokens: int,
+    poll_interval: float,
+) -> Dict[str, str]:
+    """Submit prompts as an OpenAI batch and return answers by custom_id."""
+    client = provider.client
+    lines = [
+        json.dumps(
+            {
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": provider.request_args(prompt, max_tokens),
+            }
+        )
+        for custom_id, prompt in prompts.items()
+    ]
+    batch_file = client.files.create(
+        file=("numen-batch.jsonl", "\n".join(lines).encode("utf-8")),
+        purpose="batch",
+    )
+    batch = client.batches.create(
+        input_file_id=batch_file.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h",
+    )
+
+    while batch.status not in ("completed", "failed", "expired", "cancelled"):
+        _wait(poll_interval, batch.status)
+        batch = client.batches.retrieve(batch.id)
+
+    if batch.status != "completed" or not batch.output_file_id:
+        return {custom_id: f"Error: Batch {batch.status}" for custom_id in prompts}
+
+    answers = {}
+    for line in client.files.content(batch.output_file_id).text.splitlines():
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        response = record.get("response") or {}
+        if record.get("error") or response.get("status_code") != 200:
+            error = record.get("error") or response.get("body", {}).get("error", {})
+            answers[record["custom_id"]] = (
+                f"Error: {error.get('message', 'request failed')}"
+            )
+        else:
+            answers[record["custom_id"]] = response["body"]["choices"][0]["message"][
+                "content"
+            ]
+    return answers
+
+
+def _anthropic_batches(provider: AnthropicProvider) -> Optional[Any]:
+    """Return the Message Batches resource, or None if the SDK predates it."""
+    messages = provider.client.messages
+    batches = getattr(messages, "batches", None)
+    if batches is None:
+        beta = getattr(provider.client, "beta", None)
+        batches = getattr(getattr(beta, "messages", None), "batches", None)
+    return batches
+
+
+def _run_anthropic_batch(
+    provider: AnthropicProvider,
+    batches: Any,
+    prompts: Dict[str, str],
+    max_tokens: int,
+    poll_interval: float,
+) -> Dict[str, str]:
+    """Submit prompts as an Anthropic message batch and return answers by custom_id."""
+    batch = batches.create(
+        requests=[
+            {
+                "custom_id": custom_id,
+                "params": provider.request_args(prompt, max_tokens),
+            }
+            for custom_id, prompt in prompts.items()
+        ]
+    )
+
+    while batch.processing_status != "ended":
+        _wait(poll_interval, batch.processing_status)
+        batch = batches.retrieve(batch.id)
+
+    answers = {}
+    for entry in batches.results(batch.id):
+        if entry.result.type == "succeeded":
+            answers[entry.custom_id] = entry.result.message.content[0].text
+        else:
+            answers[entry.custom_id] = f"Error: Request {entry.result.type}"
+    return answers
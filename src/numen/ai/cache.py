@@ -0,0 +1,94 @@
+"""Persistent response cache for AI providers."""
+
+import hashlib
+import json
+import pathlib
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from numen.config import get_cache_dir
+
+
+def make_key(
+    provider: str,
+    model: str,
+    temperature: float,
+    prompt: str,
+    system: str = "",
+    max_tokens: int = 0,
+) -> str:
+    """Build a stable cache key for a generation request.
+
+    Every parameter that can change the response is part of the key, so two
+    requests share a cache entry only when they are interchangeable.
+    """
+    payload = json.dumps(
+        {
+            "provider": provider,
+            "model": model,
+            "temperature": temperature,
+            "system": system,
+            "max_tokens": max_tokens,
+            "prompt": prompt,
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class DiskCache:
+    """Key/value store for generated text, backed by SQLite."""
+
+    def __init__(self, path: Optional[pathlib.Path] = None) -> None:
+        if path is None:
+            path = get_cache_dir() / "llm.sqlite3"
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, ts INTEGER NOT NULL, ttl INTEGER NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached value for key, or None if missing or expired."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, ts, ttl FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None:
+                return None
+
+            value, ts, ttl = row
+            if ttl > 0 and ts + ttl < time.time():
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+
+            return str(value)
+
+    def set(self, key: str, value: str, ttl: int = 86400) -> None:
+        """Store value under key for ttl seconds (0 keeps it forever)."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, ts, ttl) VALUES (?, ?, ?, ?)",
+                (key, value, int(time.time()), ttl),
+            )
+            self._conn.commit()
+
+    def clear(self) -> None:
+        """Remove every cached response."""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
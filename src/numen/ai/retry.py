@@ -0,0 +1,51 @@
+"""Retry helpers for transient AI provider errors."""
+
+import asyncio
+import random
+import time
+from typing import Any, Callable, Tuple, Type
+
+MAX_ATTEMPTS = 5
+INITIAL_WAIT = 1.0
+MAX_WAIT = 30.0
+
+
+def backoff(
+    attempt: int, initial: float = INITIAL_WAIT, maximum: float = MAX_WAIT
+) -> float:
+    """Return the wait before retry number attempt (0-based): exponential with jitter."""
+    return min(maximum, initial * 2.0**attempt + random.uniform(0, initial))
+
+
+def retry_call(
+    func: Callable[..., Any],
+    retry_on: Tuple[Type[BaseException], ...],
+    *args: Any,
+    attempts: int = MAX_ATTEMPTS,
+    **kwargs: Any,
+) -> Any:
+    """Call func, retrying with backoff while it raises one of retry_on."""
+    for attempt in range(attempts):
+        try:
+            return func(*args, **kwargs)
+        except retry_on:
+            if attempt == attempts - 1:
+                raise
+            time.sleep(backoff(attempt))
+
+
+async def aretry_call(
+    func: Callable[..., Any],
+    retry_on: Tuple[Type[BaseException], ...],
+    *args: Any,
+    attempts: int = MAX_ATTEMPTS,
+    **kwargs: Any,
+) -> Any:
+    """Await func, retrying with backoff while it raises one of retry_on."""
+    for attempt in range(attempts):
+        try:
+            return await func(*args, **kwargs)
+        except retry_on:
+            if attempt == attempts - 1:
+                raise
+            await asyncio.sleep(backoff(attempt))
@@ -0,0 +1,148 @@
+"""Similarity-based response cache for AI providers.
+
+Prompts are embedded locally and a cached response is reused when a new
+prompt is close enough to one that was already answered. This catches
+requests that differ only slightly (e.g. a note with a typo fixed), which
+the exact-match cache in numen.ai.cache cannot.
+"""
+
+import importlib.util
+import json
+import math
+import pathlib
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from numen.config import get_cache_dir
+
+Vector = List[float]
+
+
+def _normalize(vector: Vector) -> Vector:
+    norm = math.sqrt(sum(x * x for x in vector))
+    if norm == 0:
+        return vector
+    return [x / norm for x in vector]
+
+
+class SemanticCache:
+    """Cache that matches prompts by cosine similarity of their embeddings."""
+
+    def __init__(
+        self,
+        namespace: str,
+        threshold: float = 0.92,
+        ttl: int = 3600,
+        backend: str = "ollama",
+        model: str = "mxbai-embed-large",
+        base_url: str = "http://localhost:11434",
+        path: Optional[pathlib.Path] = None,
+    ) -> None:
+        if path is None:
+            path = get_cache_dir() / "semantic.sqlite3"
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        self.namespace = namespace
+        self.threshold = threshold
+        self.ttl = ttl
+        self.backend = backend
+        self.model = model
+        self.base_url = base_url
+        self._encoder: Optional[Any] = None
+        self._embeddings: Dict[str, Vector] = {}
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries "
+            "(id INTEGER PRIMARY KEY, namespace TEXT NOT NULL, vector TEXT NOT NULL, "
+            "response TEXT NOT NULL, ts INTEGER NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS entries_namespace ON entries (namespace)"
+        )
+        self._conn.commit()
+
+    def embed(self, text: str) -> Optional[Vector]:
+        """Return a unit-length embedding for text, or None if unavailable."""
+        if text in self._embeddings:
+            return self._embeddings[text]
+
+        try:
+            if self.backend == "sentence-transformers" and importlib.util.find_spec(
+                "sentence_transformers"
+            ):
+                if self._encoder is None:
+                    from sentence_transformers import SentenceTransformer
+
+                    self._encoder = SentenceTransformer(self.model)
+                vector = [float(x) for x in self._encoder.encode(text)]
+            else:
+                import requests  # Import here to ensure requests is available
+
+                response = requests.post(
+                    f"{self.base_url}/api/embeddings",
+                    json={"model": self.model, "prompt": text},
+                    timeout=(5, 60),
+                )
+                if response.status_code != 200:
+                    return None
+                vector = response.json().get("embedding") or []
+        except Exception:
+            return None
+
+        if not vector:
+            return None
+
+        vector = _normalize(vector)
+        # Only the most recent lookup is needed again (for set after a miss)
+        self._embeddings = {text: vector}
+        return vector
+
+    def get(self, prompt: str) -> Optional[str]:
+        """Return the response of the most similar cached prompt above the threshold."""
+        vector = self.embed(prompt)
+        if vector is None:
+            return None
+
+        cutoff = int(time.time()) - self.ttl if self.ttl > 0 else 0
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT vector, response FROM entries WHERE namespace = ? AND ts >= ?",
+                (self.namespace, cutoff),
+            ).fetchall()
+
+        best_score = self.threshold
+        best_response = None
+        for stored, response in rows:
+            # Both vectors are normalized, so the dot product is the cosine similarity
+            score = sum(a * b for a, b in zip(vector, json.loads(stored)))
+            if score >= best_score:
+                best_score = score
+                best_response = response
+
+        return best_response
+
+    def set(self, prompt: str, response: str) -> None:
+        """Remember response as the answer to prompt."""
+        vector = self.embed(prompt)
+        if vector is None:
+            return
+
+        with self._lock:
+            if self.ttl > 0:
+                self._conn.execute(
+                    "DELETE FROM entries WHERE namespace = ? AND ts < ?",
+                    (self.namespace, int(time.time()) - self.ttl),
+                )
+            self._conn.execute(
+                "INSERT INTO entries (namespace, vector, response, ts) VALUES (?, ?, ?, ?)",
+                (self.namespace, json.dumps(vector), response, int(time.time())),
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,101 @@
+"""Token counting and token-budget trimming for AI prompts."""
+
+import functools
+import importlib.util
+from typing import Any, Callable, Optional
+
+from numen.utils import count_tokens as estimate_tokens
+from numen.utils import trim_content
+
+# Context window sizes by model-name prefix; the longest matching prefix wins
+CONTEXT_WINDOWS = {
+    "gpt-4o": 128000,
+    "gpt-4-turbo": 128000,
+    "gpt-4": 8192,
+    "gpt-3.5": 16385,
+    "claude-3": 200000,
+    "claude": 100000,
+    "gemini-1.5": 1000000,
+    "gemini": 30720,
+    "llama3": 8192,
+}
+DEFAULT_CONTEXT_WINDOW = 8192
+
+# Room kept free for the response (max_tokens) and the prompt wrapper
+RESERVED_TOKENS = 1024 + 256
+
+TRIM_MARKER = "\n\n[...content trimmed for size...]\n\n"
+
+
+def context_window(model: str) -> int:
+    """Return the context window of model in tokens."""
+    model = model.lower()
+    matches = [prefix for prefix in CONTEXT_WINDOWS if model.startswith(prefix)]
+    if not matches:
+        return DEFAULT_CONTEXT_WINDOW
+    return CONTEXT_WINDOWS[max(matches, key=len)]
+
+
+def input_budget(model: str, max_input_tokens: int) -> int:
+    """Return how many tokens of note text may be sent to model."""
+    return max(0, min(max_input_tokens, context_window(model) - RESERVED_TOKENS))
+
+
+@functools.lru_cache(maxsize=8)
+def _encoder(provider: str, model: str) -> Optional[Any]:
+    """Return a tiktoken encoding for provider/model, or None to estimate."""
+    if provider not in ("openai", "anthropic") or not importlib.util.find_spec(
+        "tiktoken"
+    ):
+        return None
+
+    import tiktoken
+
+    if provider == "openai":
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            pass
+    # Claude's tokenizer is not available offline; cl100k is a close stand-in
+    return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(provider: str, model: str, text: str) -> int:
+    """Count the tokens text uses for the given provider and model.
+
+    Uses tiktoken when it is installed and falls back to the
+    characters / 4 estimate otherwise.
+    """
+    encoder = _encoder(provider, model)
+    if encoder is None:
+        return estimate_tokens(text)
+    return len(encoder.encode(text, disallowed_special=()))
+
+
+def trim_to_tokens(text: str, budget: int, counter: Callable[[str], int]) -> str:
+    """Trim text until counter(text) fits in budget.
+
+    Binary-searches the character size passed to trim_content, so the first
+    and last sections are kept whenever they fit.
+    """
+    if counter(text) <= budget:
+        return text
+
+    def candidate(size: int) -> str:
+        trimmed = trim_content(text, size)
+        if len(trimmed) > size + len(TRIM_MARKER):
+            # The first and last sections alone are too large: cut head and tail
+            half = size // 2
+            trimmed = text[:half] + TRIM_MARKER + (text[-half:] if half else "")
+        return trimmed
+
+    low, high = 0, len(text)
+    tolerance = max(64, len(text) // 200)
+    while high - low > tolerance:
+        middle = (low + high) // 2
+        if counter(candidate(middle)) <= budget:
+            low = middle
+        else:
+            high = middle
+
+    return candidate(low)
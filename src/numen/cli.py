@@ -2,18 +2,15 @@
 
 import os
 import pathlib
-import subprocess
-from typing import List, Optional
+import time
+from typing import TYPE_CHECKING, Deque, Iterable, List, Optional, Tuple, Union
 from datetime import datetime
 
 import typer
-import frontmatter
 from rich.console import Console
-from rich.markdown import Markdown
-from rich.table import Table
 
-from numen.ai import process_text, get_ai_provider
 from numen.config import get_ai_config, get_config, get_editor, get_notes_dir, ensure_config_exists
+from numen.utils import display_markdown, ensure_dir, loads_post, open_atomic, open_in_editor, read_frontmatter
 from numen.notes import (
     create_note,
     display_notes,
@@ -21,11 +18,15 @@ from numen.notes import (
     get_section_content,
     list_notes,
     resolve_note_path,
+    scan_note_entries,
     search_notes,
     update_note_content,
     update_tags,
 )
 
+if TYPE_CHECKING:
+    import zipfile
+
 app = typer.Typer(
     name="numen",
     help="Numen - AI-Augmented Terminal Notepad",
@@ -52,6 +53,28 @@ app.add_typer(history_app, name="history")
 
 console = Console()
 
+# Locale month names, computed once instead of via strptime/strftime per row
+MONTH_NAMES = [datetime(2000, month, 1).strftime("%B") for month in range(1, 13)]
+
+
+def _stream_markdown(chunks: Iterable[str]) -> str:
+    """Render streamed AI output live as Markdown and return the full text."""
+    from rich.live import Live
+    from rich.markdown import Markdown
+    
+    text = ""
+    last_refresh = 0.0
+    with Live(Markdown(""), console=console, refresh_per_second=8, vertical_overflow="visible") as live:
+        for chunk in chunks:
+            text += chunk
+            # Re-parsing Markdown on every token is wasteful, so throttle updates
+            now = time.monotonic()
+            if now - last_refresh >= 0.1:
+                live.update(Markdown(text))
+                last_refresh = now
+        live.update(Markdown(text))
+    return text
+
 
 @app.callback()
 def app_callback(ctx: typer.Context):
@@ -90,7 +113,7 @@ def new_note(
     note_path = create_note(title, template)
     console.print(f"[green]Created note at:[/green] {note_path}")
     
-    edit_note(str(note_path))
+    edit_note(str(note_path), replace_process=True)
 
 
 @app.command("list")
@@ -126,7 +149,7 @@ def edit_note_cmd(note: str = typer.Argument(..., help="Note to edit (filename o
     Example:
       numen edit my-note
     """
-    success = edit_note(note)
+    success = edit_note(note, replace_process=True)
     if not success:
         console.print(f"[red]Failed to edit note: {note}[/red]")
 
@@ -167,14 +190,9 @@ def tag_note(
       numen tag my-note draft           # Remove 'draft' tag
       numen tag my-note +urgent draft   # Add 'urgent' and remove 'draft'
     """
-    add_tags = []
-    remove_tags = []
-    
-    for tag in tags:
-        if tag.startswith("+"):
-            add_tags.append(tag[1:])
-        else:
-            remove_tags.append(tag)
+    is_add = [tag[:1] == "+" for tag in tags]
+    add_tags = [tag[1:] for tag, add in zip(tags, is_add) if add]
+    remove_tags = [tag for tag, add in zip(tags, is_add) if not add]
     
     success = update_tags(note, add_tags, remove_tags)
     
@@ -205,14 +223,31 @@ def edit_config():
     Example:
       numen config
     """
-    from numen.config import CONFIG_FILE
+    from numen.config import CONFIG_FILE, invalidate_config
     
-    editor = get_editor()
+    console.print(f"[green]Editing config file: {CONFIG_FILE}[/green]")
+    # Nothing else needs to run after the editor, so it may replace this process
+    if not open_in_editor(get_editor(), CONFIG_FILE, replace_process=True):
+        return
+    
+    from numen.ai import reset_ai_provider
     
-    subprocess.run([editor, CONFIG_FILE], check=False)
+    invalidate_config()
+    reset_ai_provider()
     console.print(f"[green]Edited config file: {CONFIG_FILE}[/green]")
 
 
+def _peek_title(path: pathlib.Path) -> str:
+    """Read a note's title from its frontmatter without reading the body."""
+    import yaml
+    
+    try:
+        title = read_frontmatter(path).get("title")
+    except (OSError, yaml.YAMLError):
+        return path.stem
+    return str(title) if title is not None else path.stem
+
+
 @app.command("remove")
 def remove_note(
     note: str = typer.Argument(..., help="Note to delete (filename or partial name)"),
@@ -234,20 +269,16 @@ def remove_note(
         console.print(f"[red]Note not found: {note}[/red]")
         return
     
-    with open(note_path, "r") as f:
-        post = frontmatter.load(f)
+    title = _peek_title(note_path)
     
-    title = post.get("title", note_path.stem)
-    
-    if not force:
-        console.print(f"Are you sure you want to delete '[bold red]{title}[/bold red]'? (y/n): ", end="")
-        confirm = input().lower().strip()
-        if confirm != "y":
-            console.print("[yellow]Deletion aborted.[/yellow]")
-            return
+    if not force and not typer.confirm(f"Are you sure you want to delete '{title}'?", default=False):
+        console.print("[yellow]Deletion aborted.[/yellow]")
+        return
     
     try:
         os.remove(note_path)
+        from numen.notes.meta_cache import forget
+        forget(note_path)
         console.print(f"[green]Successfully deleted note: [bold]{title}[/bold][/green]")
     except Exception as e:
         console.print(f"[red]Error deleting note: {e}[/red]")
@@ -275,7 +306,19 @@ def view_note(
     
     try:
         with open(note_path, "r", encoding="utf-8") as f:
-            post = frontmatter.load(f)
+            text = f.read()
+    except Exception as e:
+        console.print(f"[red]Error reading note: {e}[/red]")
+        return
+    
+    if raw:
+        # The file as it is on disk; nothing to parse or re-serialize
+        console.print(f"[bold]File:[/bold] {note_path}")
+        console.print(text, markup=False, highlight=False)
+        return
+    
+    try:
+        post = loads_post(text)
     except Exception as e:
         console.print(f"[red]Error reading note: {e}[/red]")
         return
@@ -293,21 +336,15 @@ def view_note(
     tags = post.get("tags", [])
     tags_str = ", ".join([f"#{tag}" for tag in tags])
     
-    if raw:
-        console.print(f"[bold]File:[/bold] {note_path}")
-        console.print(frontmatter.dumps(post))
+    header = f"[bold cyan]{title}[/bold cyan]\n[dim]Date: {date_str}[/dim]\n"
+    if tags:
+        header += f"[yellow]Tags: {tags_str}[/yellow]\n"
+    console.print(header + "---", highlight=False)
+    
+    if post.content and not post.content.isspace():
+        display_markdown(post.content, page=True)
     else:
-        console.print(f"[bold cyan]{title}[/bold cyan]")
-        console.print(f"[dim]Date: {date_str}[/dim]")
-        if tags:
-            console.print(f"[yellow]Tags: {tags_str}[/yellow]")
-        console.print("---")
-        
-        if post.content.strip():
-            md = Markdown(post.content)
-            console.print(md)
-        else:
-            console.print("[italic dim]No content[/italic dim]")
+        console.print("[italic dim]No content[/italic dim]")
 
 
 @ai_app.command("expand")
@@ -328,24 +365,22 @@ def expand_text(
       numen ai expand my-note --replace
       numen ai expand my-note --preview
     """
-    content = get_section_content(note, section)
-    if content is None:
+    from numen.ai import process_text, process_text_stream
+    
+    resolved = get_section_content(note, section)
+    if resolved is None:
         return
+    note_path, content = resolved
     
     console.print("[blue]Sending to AI for expansion...[/blue]")
-    expanded = process_text("expand", content)
-    
     if preview:
         console.print("\n[bold]Expanded version:[/bold]")
-        console.print(Markdown(expanded))
+        _stream_markdown(process_text_stream("expand", content))
         return
     
-    note_path = resolve_note_path(note)
-    if note_path is None:
-        console.print(f"[red]Note not found: {note}[/red]")
-        return
+    expanded = process_text("expand", content)
     
-    success = update_note_content(note, expanded, section, preserve_original=not replace)
+    success = update_note_content(note_path, expanded, section, preserve_original=not replace)
     
     if success:
         console.print("[green]Successfully expanded text![/green]")
@@ -374,19 +409,22 @@ def summarize_text(
       numen ai summarize my-note --replace
       numen ai summarize my-note --preview
     """
-    content = get_section_content(note, section)
-    if content is None:
+    from numen.ai import process_text, process_text_stream
+    
+    resolved = get_section_content(note, section)
+    if resolved is None:
         return
+    note_path, content = resolved
     
     console.print("[blue]Sending to AI for summarization...[/blue]")
-    summary = process_text("summarize", content)
-    
     if preview:
         console.print("\n[bold]Summary:[/bold]")
-        console.print(Markdown(summary))
+        _stream_markdown(process_text_stream("summarize", content))
         return
     
-    success = update_note_content(note, summary, section, preserve_original=not replace)
+    summary = process_text("summarize", content)
+    
+    success = update_note_content(note_path, summary, section, preserve_original=not replace)
     
     if success:
         console.print("[green]Successfully summarized text![/green]")
@@ -415,19 +453,22 @@ def poetic_rewrite(
       numen ai poetic my-note --replace
       numen ai poetic my-note --preview
     """
-    content = get_section_content(note, section)
-    if content is None:
+    from numen.ai import process_text, process_text_stream
+    
+    resolved = get_section_content(note, section)
+    if resolved is None:
         return
+    note_path, content = resolved
     
     console.print("[blue]Sending to AI for poetic transformation...[/blue]")
-    poem = process_text("poetic", content)
-    
     if preview:
         console.print("\n[bold]Poetic version:[/bold]")
-        console.print(Markdown(poem))
+        _stream_markdown(process_text_stream("poetic", content))
         return
     
-    success = update_note_content(note, poem, section, preserve_original=not replace)
+    poem = process_text("poetic", content)
+    
+    success = update_note_content(note_path, poem, section, preserve_original=not replace)
     
     if success:
         console.print("[green]Successfully transformed text into poetry![/green]")
@@ -463,9 +504,12 @@ def custom_ai_instruction(
       numen ai custom my-note "Summarize the main points" --replace
       numen ai custom my-note "Generate a table of contents" --preview
     """
-    content = get_section_content(note, section)
-    if content is None:
+    from numen.ai import get_ai_provider
+    
+    resolved = get_section_content(note, section)
+    if resolved is None:
         return
+    note_path, content = resolved
     
     console.print(f"[blue]Sending to AI with instruction: [bold]{instruction}[/bold][/blue]")
     
@@ -475,14 +519,15 @@ def custom_ai_instruction(
 """
     
     provider = get_ai_provider()
-    result = provider.generate_text(custom_prompt)
     
     if preview:
         console.print("\n[bold]AI result:[/bold]")
-        console.print(Markdown(result))
+        _stream_markdown(provider.generate_text_stream(custom_prompt))
         return
     
-    success = update_note_content(note, result, section, preserve_original=not replace)
+    result = provider.generate_text(custom_prompt)
+    
+    success = update_note_content(note_path, result, section, preserve_original=not replace)
     
     if success:
         console.print("[green]Successfully processed text with AI![/green]")
@@ -493,19 +538,85 @@ def custom_ai_instruction(
         console.print(result)
 
 
+def _zip_date_time(mtime: float) -> tuple:
+    """Convert an mtime to the (y, m, d, H, M, S) a zip entry stores, at its 2-second resolution."""
+    date_time = time.localtime(mtime)[:6]
+    date_time = max(date_time, (1980, 1, 1, 0, 0, 0))
+    return date_time[:5] + (date_time[5] // 2 * 2,)
+
+
+def _read_zip_entry(entry: os.DirEntry, compression: int) -> Tuple["zipfile.ZipInfo", bytes]:
+    """Read a note and build the zip entry header for it, keeping its mtime."""
+    import zipfile
+    
+    with open(entry.path, "rb") as f:
+        data = f.read()
+    info = zipfile.ZipInfo(entry.name, _zip_date_time(entry.stat().st_mtime))
+    info.compress_type = compression
+    info.external_attr = 0o644 << 16
+    return info, data
+
+
+def _read_zip_entries(note_files: List[os.DirEntry], compression: int, window: int = 64) -> Iterable[tuple]:
+    """Yield (ZipInfo, data) for each note in order, reading ahead on a thread pool.
+    
+    At most window notes are read ahead of the writer, which keeps memory
+    bounded on large collections while reads overlap with compression.
+    """
+    import collections
+    from concurrent.futures import Future, ThreadPoolExecutor
+    
+    with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4)) as executor:
+        pending: Deque[Future] = collections.deque()
+        for entry in note_files:
+            pending.append(executor.submit(_read_zip_entry, entry, compression))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def _backup_is_current(output_path: str, note_files: List[os.DirEntry], compression: int) -> bool:
+    """Check whether an existing backup already holds exactly these notes, unchanged."""
+    import zipfile
+    
+    try:
+        with zipfile.ZipFile(output_path, 'r') as zipf:
+            archived = {
+                info.filename: (info.date_time, info.file_size, info.compress_type)
+                for info in zipf.infolist()
+            }
+    except (OSError, zipfile.BadZipFile):
+        return False
+    
+    if len(archived) != len(note_files):
+        return False
+    for entry in note_files:
+        stat = entry.stat()
+        if archived.get(entry.name) != (_zip_date_time(stat.st_mtime), stat.st_size, compression):
+            return False
+    return True
+
+
 @app.command("backup")
 def backup_notes(
     output_path: Optional[str] = typer.Argument(None, help="Output path for the backup zip file (default: numen_backup_YYYY-MM-DD.zip)"),
+    fast: bool = typer.Option(False, "--fast", "--no-compress", "-F", help="Store notes without compression (faster, larger file)"),
+    level: Optional[int] = typer.Option(None, "--level", "-l", min=1, max=9, help="DEFLATE compression level (1 = fastest, 9 = smallest; default 1)"),
 ):
     """Create a backup of all notes as a zip file.
     
     This creates a zip archive containing all your notes, preserving folder structure.
     By default, the backup is saved in the current directory with a timestamp in the filename.
+    If the backup file already exists and no note has changed since, it is left as is,
+    unless --level asks for a specific compression level.
     
     Examples:
       numen backup                    # Default filename in current directory
       numen backup my-notes.zip       # Custom filename in current directory
       numen backup /path/to/backup.zip  # Custom path and filename
+      numen backup --fast             # Skip compression
+      numen backup --level 9          # Smallest archive, slowest
     """
     import zipfile
     
@@ -521,20 +632,26 @@ def backup_notes(
     try:
         output_path = os.path.expanduser(output_path)
         
-        with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-            note_files = list(notes_dir.glob("*.md"))
-            total_files = len(note_files)
-            
-            if total_files == 0:
-                console.print("[yellow]No notes found to back up.[/yellow]")
-                return
-            
-            console.print(f"[blue]Backing up {total_files} notes to {output_path}...[/blue]")
-            
-            for i, note_path in enumerate(note_files):
-                relative_path = os.path.basename(note_path)
-                zipf.write(note_path, relative_path)
-                
+        note_files = scan_note_entries(notes_dir)
+        total_files = len(note_files)
+        
+        if total_files == 0:
+            console.print("[yellow]No notes found to back up.[/yellow]")
+            return
+        
+        compression = zipfile.ZIP_STORED if fast else zipfile.ZIP_DEFLATED
+        # The archive doesn't record the level it was written with, so an explicit --level always rebuilds it
+        if level is None and os.path.exists(output_path) and _backup_is_current(output_path, note_files, compression):
+            console.print(f"[green]Backup at {output_path} is already up to date ({total_files} notes).[/green]")
+            return
+        
+        console.print(f"[blue]Backing up {total_files} notes to {output_path}...[/blue]")
+        
+        # Build the archive next to the target and swap it in, so an existing backup is never left half-written
+        with open_atomic(output_path) as f, zipfile.ZipFile(f, 'w', compression) as zipf:
+            for info, data in _read_zip_entries(note_files, compression):
+                zipf.writestr(info, data, compresslevel=level or 1)
+        
         console.print(f"[green]Successfully created backup at: {output_path}[/green]")
         console.print(f"[green]Backed up {total_files} notes.[/green]")
     except Exception as e:
@@ -555,6 +672,7 @@ def import_notes(
       numen import backup.zip
       numen import backup.zip --overwrite
     """
+    import shutil
     import zipfile
     
     notes_dir = get_notes_dir()
@@ -578,17 +696,35 @@ def import_notes(
             console.print(f"[blue]Importing {len(md_files)} notes from {import_path}...[/blue]")
             
             imported = 0
-            skipped = 0
+            # A custom notes directory may not have been created yet
+            ensure_dir(notes_dir)
             
+            # Notes are imported by base name, so only the first of several entries sharing one is kept
+            members = []
+            seen = set()
             for file in md_files:
-                target_path = os.path.join(notes_dir, os.path.basename(file))
-                
-                if os.path.exists(target_path) and not overwrite:
-                    console.print(f"[yellow]Skipping existing note: {os.path.basename(file)}[/yellow]")
-                    skipped += 1
+                name = os.path.basename(file)
+                if name in seen:
+                    console.print(f"[yellow]Skipping {file}: another note in the archive is also named {name}[/yellow]", highlight=False)
                     continue
-                
-                zipf.extract(file, notes_dir)
+                seen.add(name)
+                members.append((file, name))
+            
+            # Decide what to skip up front from one directory listing, and report it in one print
+            if overwrite:
+                skipped_names = []
+            else:
+                existing = set(os.listdir(notes_dir))
+                skipped_names = [name for _, name in members if name in existing]
+                members = [(file, name) for file, name in members if name not in existing]
+            skipped = len(skipped_names)
+            if skipped_names:
+                console.print("\n".join(f"[yellow]Skipping existing note: {name}[/yellow]" for name in skipped_names), highlight=False)
+            
+            for file, name in members:
+                # Stream the entry into a temporary file so a failed import never leaves a partial note
+                with zipf.open(file) as src, open_atomic(os.path.join(notes_dir, name)) as dst:
+                    shutil.copyfileobj(src, dst, 1024 * 1024)
                 imported += 1
                 
             console.print(f"[green]Successfully imported {imported} notes.[/green]")
@@ -612,84 +748,75 @@ def note_statistics():
     Example:
       numen stats
     """
+    import array
     import collections
     import statistics
+    from rich.console import Group
+    from rich.table import Table
+    from rich.text import Text
+    from numen.notes.meta_cache import load_many
     
-    notes_dir = get_notes_dir()
-    all_notes = list(notes_dir.glob("*.md"))
+    all_notes = scan_note_entries()
     
     if not all_notes:
         console.print("[yellow]No notes found.[/yellow]")
         return
     
-    note_data = []
-    all_tags = []
-    word_counts = []
-    dates = []
-    
-    for note_path in all_notes:
-        try:
-            with open(note_path, "r", encoding="utf-8") as f:
-                post = frontmatter.load(f)
-                
-            date = post.get("date", "")
-            if isinstance(date, datetime):
-                date_obj = date
-            else:
-                try:
-                    date_obj = datetime.fromisoformat(date)
-                except (ValueError, TypeError):
-                    date_obj = None
-            
-            if date_obj:
-                dates.append(date_obj)
-            
-            tags = post.get("tags", [])
-            all_tags.extend(tags)
-            
-            word_count = len(post.content.split())
-            word_counts.append(word_count)
-            
-            note_filename = os.path.basename(str(note_path))
-            title_fallback = os.path.splitext(note_filename)[0]
-            
-            note_data.append({
-                "path": note_path,
-                "title": post.get("title", title_fallback),
-                "date": date_obj,
-                "tags": tags,
-                "word_count": word_count,
-            })
-        except Exception as e:
-            console.print(f"[red]Error processing {os.path.basename(str(note_path))}: {e}[/red]")
-    
-    console.print("[bold green]📊 Note Statistics[/bold green]")
-    console.print(f"[cyan]Total notes:[/cyan] {len(all_notes)}")
-    
-    if dates:
-        oldest_date = min(dates)
-        newest_date = max(dates)
-        console.print(f"[cyan]Date range:[/cyan] {oldest_date.strftime('%Y-%m-%d')} to {newest_date.strftime('%Y-%m-%d')}")
-        
-        month_counts = collections.Counter([d.strftime("%Y-%m") for d in dates])
+    def report(entry: os.DirEntry, error: str) -> None:
+        console.print(f"[red]Error processing {entry.name}: {error}[/red]")
+    
+    # Unchanged notes come from the metadata cache; large batches of changed ones are parsed in parallel
+    metas = load_many(all_notes, on_error=report)
+    
+    tag_counts: collections.Counter = collections.Counter()
+    month_counts: collections.Counter = collections.Counter()
+    word_counts = array.array("I")
+    oldest_date: Optional[datetime] = None
+    newest_date: Optional[datetime] = None
+    
+    # One pass over the cached metadata fills every counter; word counts are kept only for the median
+    count_tags = tag_counts.update
+    add_word_count = word_counts.append
+    parse_date = datetime.fromisoformat
+    for meta in metas:
+        if meta is None:
+            continue
+        count_tags(meta["tags"])
+        add_word_count(meta["word_count"])
+        if meta["date"]:
+            try:
+                date = parse_date(meta["date"])
+            except ValueError:
+                continue
+            month_counts[date.year, date.month] += 1
+            if oldest_date is None or date < oldest_date:
+                oldest_date = date
+            if newest_date is None or date > newest_date:
+                newest_date = date
+    
+    # Collect everything and print once; markup lines skip rich's auto-highlighter
+    output = [
+        Text.from_markup("[bold green]📊 Note Statistics[/bold green]"),
+        Text.from_markup(f"[cyan]Total notes:[/cyan] {len(all_notes)}"),
+    ]
+    
+    if month_counts:
+        output.append(Text.from_markup(f"[cyan]Date range:[/cyan] {oldest_date.strftime('%Y-%m-%d')} to {newest_date.strftime('%Y-%m-%d')}"))
         
-        console.print("\n[bold]Notes per month:[/bold]")
+        output.append(Text.from_markup("\n[bold]Notes per month:[/bold]"))
         table = Table(show_header=True, header_style="bold")
         table.add_column("Month")
         table.add_column("Count", justify="right")
         
-        for month, count in sorted(month_counts.items(), reverse=True)[:12]:
-            year, month = month.split("-")
-            month_name = datetime.strptime(month, "%m").strftime("%B")
-            table.add_row(f"{month_name} {year}", str(count))
+        for (year, month), count in sorted(month_counts.items(), reverse=True)[:12]:
+            table.add_row(f"{MONTH_NAMES[month - 1]} {year}", str(count))
         
-        console.print(table)
+        output.append(table)
     
-    if all_tags:
-        tag_counts = collections.Counter(all_tags)
+    if tag_counts:
         top_tags = tag_counts.most_common(10)
         
-        console.print("\n[bold]Top tags:[/bold]")
+        output.append(Text.from_markup("\n[bold]Top tags:[/bold]"))
         table = Table(show_header=True, header_style="bold")
         table.add_column("Tag")
         table.add_column("Count", justify="right")
@@ -699,18 +826,20 @@ def note_statistics():
             percentage = (count / len(all_notes)) * 100
             table.add_row(tag, str(count), f"{percentage:.1f}%")
         
-        console.print(table)
+        output.append(table)
     
     if word_counts:
-        avg_words = statistics.mean(word_counts)
+        avg_words = sum(word_counts) / len(word_counts)
         median_words = statistics.median(word_counts)
         min_words = min(word_counts)
         max_words = max(word_counts)
         
-        console.print(f"\n[cyan]Word count statistics:[/cyan]")
-        console.print(f"Average: {avg_words:.0f} words")
-        console.print(f"Median: {median_words:.0f} words")
-        console.print(f"Range: {min_words} to {max_words} words")
+        output.append(Text.from_markup("\n[cyan]Word count statistics:[/cyan]"))
+        output.append(Text(f"Average: {avg_words:.0f} words"))
+        output.append(Text(f"Median: {median_words:.0f} words"))
+        output.append(Text(f"Range: {min_words} to {max_words} words"))
+    
+    console.print(Group(*output))
 
 
 @templates_app.callback()
@@ -779,7 +908,7 @@ def create_template_cmd(
     console.print(f"[green]Created template:[/green] {template_path}")
     
     # Open the template for editing
-    edit_template(name)
+    edit_template(name, replace_process=True)
 
 
 @templates_app.command("edit")
@@ -795,7 +924,7 @@ def edit_template_cmd(name: str = typer.Argument(..., help="Template to edit")):
     from numen.templates import edit_template, ensure_default_templates
     
     ensure_default_templates()
-    success = edit_template(name)
+    success = edit_template(name, replace_process=True)
     
     if not success:
         console.print(f"[red]Failed to edit template: {name}[/red]")
@@ -866,6 +995,19 @@ def show_template_cmd(name: str = typer.Argument(..., help="Template to display"
     console.print("```")
 
 
+def _parse_version_ref(version: str) -> Union[int, str]:
+    """Turn a version argument into an index, or leave it as a version ID.
+    
+    Whole numbers, including negative ones, are indexes, except for the
+    14-digit timestamps that regular version IDs are made of. IDs of saves
+    within the same second carry a "-NNN" suffix and are never numbers.
+    """
+    digits = version[1:] if version.startswith("-") else version
+    if digits.isdecimal() and len(digits) != 14:
+        return int(version)
+    return version
+
+
 @history_app.callback()
 def history_callback(ctx: typer.Context):
     """Version history management for notes.
@@ -959,14 +1101,7 @@ def view_version_cmd(
         console.print(f"[red]Note not found: {note}[/red]")
         return
     
-    # Convert version to int if it's a numeric string
-    try:
-        if version.isdigit():
-            version_ref = int(version)
-        else:
-            version_ref = version
-    except (ValueError, AttributeError):
-        version_ref = version
+    version_ref = _parse_version_ref(version)
     
     content = get_version_content(note_path.stem, version_ref)
     
@@ -980,9 +1115,8 @@ def view_version_cmd(
         console.print(content)
     else:
         try:
-            post = frontmatter.loads(content)
-            md = Markdown(post.content)
-            console.print(md)
+            post = loads_post(content)
+            display_markdown(post.content)
         except Exception:
             # Fallback to raw display if parsing fails
             console.print(content)
@@ -1014,14 +1148,7 @@ def restore_version_cmd(
         console.print(f"[red]Note not found: {note}[/red]")
         return
     
-    # Convert version to int if it's a numeric string
-    try:
-        if version.isdigit():
-            version_ref = int(version)
-        else:
-            version_ref = version
-    except (ValueError, AttributeError):
-        version_ref = version
+    version_ref = _parse_version_ref(version)
     
     if not force:
         confirm = input(f"Are you sure you want to restore note '{note_path.stem}' to version {version}? (y/N): ")
@@ -1061,22 +1188,8 @@ def diff_versions_cmd(
         console.print(f"[red]Note not found: {note}[/red]")
         return
     
-    # Convert versions to int if they're numeric strings
-    try:
-        if version1.isdigit():
-            version_ref1 = int(version1)
-        else:
-            version_ref1 = version1
-    except (ValueError, AttributeError):
-        version_ref1 = version1
-        
-    try:
-        if version2.isdigit():
-            version_ref2 = int(version2)
-        else:
-            version_ref2 = version2
-    except (ValueError, AttributeError):
-        version_ref2 = version2
+    version_ref1 = _parse_version_ref(version1)
+    version_ref2 = _parse_version_ref(version2)
     
     diff_lines = compare_versions(note_path.stem, version_ref1, version_ref2)
     
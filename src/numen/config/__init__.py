@@ -1,8 +1,9 @@
 """Configuration management for Numen."""
 
+import copy
 import os
 import pathlib
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
 
 import toml
 from rich.console import Console
@@ -18,6 +19,17 @@ DEFAULT_CONFIG = {
         "ollama_base_url": "http://localhost:11434",
         "default_model": "gemini-1.5-flash",
         "temperature": 0.7,
+        "max_input_tokens": 25000,  # Upper bound on note text sent per request
+        "action_max_tokens": {"expand": 800, "summarize": 256, "poetic": 400},  # Output budget per action
+        "cache_enabled": True,  # Reuse responses for identical requests
+        "cache_all": False,  # Also cache when temperature > 0
+        "cache_ttl": 86400,  # Seconds; 0 keeps entries forever
+        "race_providers": False,  # Send to every configured provider, keep the fastest answer
+        "semantic_cache": False,  # Reuse responses for near-duplicate text
+        "semantic_cache_threshold": 0.92,
+        "semantic_cache_ttl": 3600,
+        "embedding_backend": "ollama",  # "ollama" or "sentence-transformers"
+        "embedding_model": "mxbai-embed-large",
     },
     "editor": {
         "default": "",  # Empty use $EDITOR env
@@ -32,6 +44,10 @@ DEFAULT_CONFIG = {
 CONFIG_DIR = os.path.expanduser("~/.numen")
 CONFIG_FILE = os.path.join(CONFIG_DIR, "config.toml")
 
+_ai_config: Optional[Dict[str, Any]] = None
+# (path, mtime_ns, size, config) of the last config file parsed by get_config
+_config_cache: Optional[Tuple[str, int, int, Dict[str, Any]]] = None
+
 
 def ensure_config_exists() -> None:
     try:
@@ -76,14 +92,38 @@ def update_config_with_new_fields(config: Dict[str, Any]) -> Dict[str, Any]:
     return updated_config
 
 
-def get_config() -> Dict[str, Any]:
+def _config_stat() -> Optional[os.stat_result]:
+    try:
+        return os.stat(CONFIG_FILE)
+    except OSError:
+        return None
+
+
+def get_config(writable: bool = True) -> Dict[str, Any]:
+    """Return the configuration, parsing the file only when it has changed.
+    
+    The result is a copy, so callers may modify it freely. Lookups that only
+    read a setting pass writable=False to get the cached dict itself.
+    """
+    global _config_cache
+    stat = _config_stat()
+    if stat is not None and _config_cache is not None:
+        path, mtime_ns, size, config = _config_cache
+        if path == CONFIG_FILE and mtime_ns == stat.st_mtime_ns and size == stat.st_size:
+            return copy.deepcopy(config) if writable else config
+    
     ensure_config_exists()
     
     try:
         with open(CONFIG_FILE, "r", encoding="utf-8") as f:
             config = toml.load(f)
         
-        return update_config_with_new_fields(config)
+        config = update_config_with_new_fields(config)
+        # Stat again: adding new default fields may have rewritten the file
+        stat = _config_stat()
+        if stat is not None:
+            _config_cache = (CONFIG_FILE, stat.st_mtime_ns, stat.st_size, copy.deepcopy(config))
+        return config
     except Exception as e:
         console.print(f"[red]Error loading config file: {e}[/red]")
         console.print("[yellow]Using default configuration...[/yellow]")
@@ -98,28 +138,34 @@ def save_config(config: Dict[str, Any]) -> None:
     except Exception as e:
         console.print(f"[red]Error saving config: {e}[/red]")
         raise
+    finally:
+        invalidate_config()
 
 
 def get_notes_dir() -> pathlib.Path:
-    config = get_config()
+    config = get_config(writable=False)
     notes_dir = os.path.expanduser(config["paths"]["notes_dir"])
     return pathlib.Path(notes_dir)
 
 
 def get_templates_dir() -> pathlib.Path:
-    config = get_config()
+    config = get_config(writable=False)
     templates_dir = os.path.expanduser(config["paths"]["templates_dir"])
     return pathlib.Path(templates_dir)
 
 
 def get_history_dir() -> pathlib.Path:
-    config = get_config()
+    config = get_config(writable=False)
     history_dir = os.path.expanduser(config["paths"]["history_dir"])
     return pathlib.Path(history_dir)
 
 
+def get_cache_dir() -> pathlib.Path:
+    return pathlib.Path(CONFIG_DIR) / "cache"
+
+
 def get_editor() -> str:
-    config = get_config()
+    config = get_config(writable=False)
     editor = config["editor"]["default"]
     if not editor:
         editor = os.environ.get("EDITOR", "nvim")
@@ -127,5 +173,21 @@ def get_editor() -> str:
 
 
 def get_ai_config() -> Dict[str, Any]:
-    config = get_config()
-    return config["ai"]
+    global _ai_config
+    if _ai_config is None:
+        config = get_config()
+        _ai_config = config["ai"]
+    return _ai_config
+
+
+def invalidate_ai_config() -> None:
+    """Forget the memoized AI settings so the next lookup re-reads the file."""
+    global _ai_config
+    _ai_config = None
+
+
+def invalidate_config() -> None:
+    """Forget the cached configuration and AI settings so the next lookup re-reads the file."""
+    global _config_cache
+    _config_cache = None
+    invalidate_ai_config()
@@ -1,26 +1,196 @@
 """Version history management for Numen notes."""
 
 import datetime
+import functools
 import json
 import os
 import pathlib
+import re
 import shutil
 from typing import Dict, List, Optional, Tuple, Union
 
-import frontmatter
 from rich.console import Console
-from rich.table import Table
 
 from numen.config import get_config
+from numen.utils import ensure_dir, forget_dir, json_loads, write_text_atomic
 
 console = Console()
 
 def get_history_dir() -> pathlib.Path:
     """Get the path to the history directory."""
-    config = get_config()
+    config = get_config(writable=False)
     history_dir = pathlib.Path(os.path.expanduser(config.get("paths", {}).get("history_dir", "~/.numen/history")))
-    os.makedirs(history_dir, exist_ok=True)
-    return history_dir
+    return ensure_dir(history_dir)
+
+def _ensure_note_history_dir(note_name: str) -> pathlib.Path:
+    """Return the history directory of a note, creating it if needed."""
+    return ensure_dir(get_history_dir() / note_name)
+
+# Per-note log of version metadata, one JSON object per line, appended on every save
+LOG_FILE = "history.log"
+
+def _append_log(history_dir: pathlib.Path, metadata: Dict) -> None:
+    """Append a saved version's metadata to the note's history log."""
+    with open(history_dir / LOG_FILE, "a", encoding="utf-8") as f:
+        f.write(json.dumps(metadata, separators=(",", ":")) + "\n")
+
+def _read_log(history_dir: pathlib.Path) -> List[Dict]:
+    """Return every metadata record in the note's history log, in the order saved."""
+    try:
+        with open(history_dir / LOG_FILE, "rb") as f:
+            lines = f.read().splitlines()
+    except FileNotFoundError:
+        return []
+    
+    records = []
+    for line in lines:
+        try:
+            records.append(json_loads(line))
+        except ValueError:
+            # A line cut short by an interrupted save
+            continue
+    return records
+
+def _migrate_legacy_metadata(history_dir: pathlib.Path, metadata_paths: List[str]) -> None:
+    """Move per-version JSON metadata files of older layouts into the history log."""
+    for metadata_path in sorted(metadata_paths):
+        with open(metadata_path, "r", encoding="utf-8") as f:
+            _append_log(history_dir, json.load(f))
+        os.unlink(metadata_path)
+
+# Once this many versions besides the newest are stored in full, they are
+# replaced by deltas against the version saved after them
+PACK_THRESHOLD = 8
+
+def _make_delta(base: str, content: str) -> List[Union[List[int], str]]:
+    """Describe content as line ranges copied from base plus inserted text."""
+    import difflib
+    
+    base_lines = base.splitlines(keepends=True)
+    lines = content.splitlines(keepends=True)
+    ops: List[Union[List[int], str]] = []
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, base_lines, lines, autojunk=False).get_opcodes():
+        if tag == "equal":
+            ops.append([i1, i2])
+        elif j1 < j2:
+            ops.append("".join(lines[j1:j2]))
+    return ops
+
+def _apply_delta(base: str, ops: List[Union[List[int], str]]) -> str:
+    """Rebuild the content a delta from _make_delta describes."""
+    base_lines = base.splitlines(keepends=True)
+    return "".join(op if isinstance(op, str) else "".join(base_lines[op[0]:op[1]]) for op in ops)
+
+def _read_version(history_dir: pathlib.Path, version_id: str) -> Optional[str]:
+    """Return the content of a stored version, following its delta chain if it is packed."""
+    return _read_version_file(str(history_dir), version_id)
+
+@functools.lru_cache(maxsize=64)
+def _read_version_file(history_dir: str, version_id: str) -> Optional[str]:
+    """Read and unpack a version; cached, since a version's content never changes once saved."""
+    deltas = []
+    while True:
+        try:
+            with open(os.path.join(history_dir, f"{version_id}.md"), "r", encoding="utf-8") as f:
+                content = f.read()
+            break
+        except FileNotFoundError:
+            pass
+        try:
+            with open(os.path.join(history_dir, f"{version_id}.delta"), "r", encoding="utf-8") as f:
+                delta = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        deltas.append(delta["ops"])
+        version_id = delta["base"]
+    
+    for ops in reversed(deltas):
+        content = _apply_delta(content, ops)
+    return content
+
+def _clear_version_caches() -> None:
+    """Forget cached version contents and diffs, including lookups of IDs not saved yet."""
+    _read_version_file.cache_clear()
+    _diff_versions.cache_clear()
+
+def _pack_if_needed(history_dir: pathlib.Path) -> None:
+    """Replace full copies of older versions with deltas once there are enough of them.
+    
+    The newest version is always kept in full. Each packed version stores a
+    delta against the next newer version, so reading an old version walks
+    the chain forward from the nearest full copy.
+    """
+    with os.scandir(history_dir) as entries:
+        names = [entry.name for entry in entries]
+    full = {name[:-3] for name in names if name.endswith(".md")}
+    version_ids = sorted(full | {name[:-6] for name in names if name.endswith(".delta")})
+    if len(full) <= PACK_THRESHOLD or not version_ids:
+        return
+    
+    # Walk from newest to oldest so each version's successor is already in hand,
+    # stopping once the last full copy is packed
+    newer_id = version_ids[-1]
+    newer = _read_version(history_dir, newer_id)
+    remaining = full - {newer_id}
+    for version_id in reversed(version_ids[:-1]):
+        if not remaining:
+            break
+        content = _read_version(history_dir, version_id)
+        if version_id in remaining:
+            remaining.discard(version_id)
+            if content is not None and newer is not None:
+                delta = {"base": newer_id, "ops": _make_delta(newer, content)}
+                with open(history_dir / f"{version_id}.delta", "w", encoding="utf-8") as f:
+                    json.dump(delta, f, separators=(",", ":"))
+                os.unlink(history_dir / f"{version_id}.md")
+        newer_id, newer = version_id, content
+
+def _share_unchanged_predecessor(history_dir: pathlib.Path, version_id: str, content: str) -> None:
+    """Stop storing the previous version in full if it is identical to the one just saved.
+    
+    Saving a note twice without editing it is common. The previous version
+    then becomes a delta that copies the new one, so the body is kept once.
+    """
+    version_ids = _version_ids(history_dir)
+    position = version_ids.index(version_id) if version_id in version_ids else 0
+    if position == 0:
+        return
+    previous_id = version_ids[position - 1]
+    
+    try:
+        with open(history_dir / f"{previous_id}.md", "r", encoding="utf-8") as f:
+            if f.read() != content:
+                return
+    except FileNotFoundError:
+        # Already packed
+        return
+    
+    with open(history_dir / f"{previous_id}.delta", "w", encoding="utf-8") as f:
+        json.dump({"base": version_id, "ops": _make_delta(content, content)}, f, separators=(",", ":"))
+    os.unlink(history_dir / f"{previous_id}.md")
+
+def _new_version_id(history_dir: pathlib.Path, base_id: str) -> str:
+    """Return base_id, with a counter appended if a version with that ID is already stored.
+    
+    A stored version may be the base of other versions' deltas, so it is never
+    overwritten, even by a second save within the same second. The suffix
+    keeps IDs in chronological order when sorted.
+    """
+    existing = set(_version_ids(history_dir))
+    version_id = base_id
+    counter = 0
+    while version_id in existing:
+        counter += 1
+        version_id = f"{base_id}-{counter:03d}"
+    return version_id
+
+def _write_atomic(path: pathlib.Path, content: str) -> None:
+    """Write content to path so that a crash leaves either the whole file or none of it.
+    
+    The version file is written before its line in the history log, so the
+    log never lists a version whose content is missing.
+    """
+    write_text_atomic(path, content, fsync=True)
 
 def save_version(note_path: pathlib.Path, message: Optional[str] = None) -> str:
     """Save the current state of a note as a version.
@@ -39,32 +209,32 @@ def save_version(note_path: pathlib.Path, message: Optional[str] = None) -> str:
     with open(note_path, "r", encoding="utf-8") as f:
         content = f.read()
     
-    # Create version ID based on timestamp
-    version_id = datetime.datetime.now().strftime("%Y%m%d%H%M%S")
-    
     # Get the stem name of the note
     note_name = note_path.stem
     
     # Create history directory for this note
-    history_dir = get_history_dir() / note_name
-    os.makedirs(history_dir, exist_ok=True)
+    history_dir = _ensure_note_history_dir(note_name)
+    
+    # Create version ID based on timestamp
+    now = datetime.datetime.now()
+    version_id = _new_version_id(history_dir, now.strftime("%Y%m%d%H%M%S"))
     
     # Save content to version file
     version_path = history_dir / f"{version_id}.md"
-    with open(version_path, "w", encoding="utf-8") as f:
-        f.write(content)
+    _clear_version_caches()
+    _write_atomic(version_path, content)
     
     # Save metadata
     metadata = {
         "version_id": version_id,
-        "timestamp": datetime.datetime.now().isoformat(),
+        "timestamp": now.isoformat(),
         "message": message or "Version saved",
         "note_path": str(note_path),
     }
     
-    metadata_path = history_dir / f"{version_id}.json"
-    with open(metadata_path, "w", encoding="utf-8") as f:
-        json.dump(metadata, f, indent=2)
+    _append_log(history_dir, metadata)
+    _share_unchanged_predecessor(history_dir, version_id, content)
+    _pack_if_needed(history_dir)
     
     return version_id
 
@@ -83,13 +253,49 @@ def list_versions(note_path: pathlib.Path) -> List[Dict]:
     if not os.path.exists(history_dir):
         return []
     
-    versions = []
-    for metadata_file in sorted(history_dir.glob("*.json"), reverse=True):
-        with open(metadata_file, "r", encoding="utf-8") as f:
-            metadata = json.load(f)
-            versions.append(metadata)
+    version_ids = set()
+    legacy_metadata = []
+    with os.scandir(history_dir) as entries:
+        for entry in entries:
+            if entry.name.endswith(".md"):
+                version_ids.add(entry.name[:-3])
+            elif entry.name.endswith(".delta"):
+                version_ids.add(entry.name[:-6])
+            elif entry.name.endswith(".json"):
+                legacy_metadata.append(entry.path)
+    if legacy_metadata:
+        _migrate_legacy_metadata(history_dir, legacy_metadata)
+    
+    # Newest first; versions whose content file is gone are skipped
+    by_id = {metadata["version_id"]: metadata for metadata in _read_log(history_dir)}
+    return [by_id[version_id] for version_id in sorted(by_id, reverse=True) if version_id in version_ids]
+
+def _version_ids(history_dir: pathlib.Path) -> List[str]:
+    """List the version IDs stored in history_dir, oldest first, without reading any metadata.
     
-    return versions
+    IDs are timestamps, so sorting the file names puts them in chronological order.
+    """
+    try:
+        with os.scandir(history_dir) as entries:
+            return sorted({
+                entry.name.rsplit(".", 1)[0] for entry in entries
+                if entry.name.endswith((".md", ".delta"))
+            })
+    except OSError:
+        return []
+
+def _resolve_in(history_dir: pathlib.Path, version_ref: Union[str, int]) -> Optional[str]:
+    """Resolve a version reference against the versions stored in history_dir."""
+    # If it's already a version ID (string), return it directly
+    if isinstance(version_ref, str):
+        return version_ref
+    
+    # Only the IDs are needed to index into the history, not the metadata
+    version_ids = _version_ids(history_dir)
+    if -len(version_ids) <= version_ref < len(version_ids):
+        return version_ids[version_ref]
+    
+    return None
 
 def resolve_version_id(note_path: pathlib.Path, version_ref: Union[str, int]) -> Optional[str]:
     """Resolve a version reference to a specific version ID.
@@ -105,31 +311,7 @@ def resolve_version_id(note_path: pathlib.Path, version_ref: Union[str, int]) ->
     Returns:
         Actual version ID or None if not found
     """
-    # If it's already a version ID (string), return it directly
-    if isinstance(version_ref, str):
-        return version_ref
-    
-    # Get all versions in chronological order (oldest first for positive indices)
-    versions = list_versions(note_path)
-    if not versions:
-        return None
-        
-    # Reverse list for positive indices (0 = oldest)
-    all_versions = list(reversed(versions))
-    
-    try:
-        # Handle negative indexing (-1 = newest)
-        if version_ref < 0 and abs(version_ref) <= len(all_versions):
-            # For negative indices, use the non-reversed list
-            return versions[version_ref]["version_id"]
-            
-        # Handle positive indexing (0 = oldest)
-        if version_ref >= 0 and version_ref < len(all_versions):
-            return all_versions[version_ref]["version_id"]
-    except (IndexError, TypeError):
-        pass
-        
-    return None
+    return _resolve_in(get_history_dir() / note_path.stem, version_ref)
 
 def get_version_content(note_name: str, version_ref: Union[str, int]) -> Optional[str]:
     """Get the content of a specific version of a note.
@@ -144,21 +326,11 @@ def get_version_content(note_name: str, version_ref: Union[str, int]) -> Optiona
     history_dir = get_history_dir() / note_name
     
     # If version_ref is an integer, resolve it to an actual version ID
-    if isinstance(version_ref, int):
-        note_path = pathlib.Path(os.path.join(get_history_dir().parent, "notes", f"{note_name}.md"))
-        version_id = resolve_version_id(note_path, version_ref)
-        if not version_id:
-            return None
-    else:
-        version_id = version_ref
-    
-    version_path = history_dir / f"{version_id}.md"
-    
-    if not os.path.exists(version_path):
+    version_id = _resolve_in(history_dir, version_ref)
+    if not version_id:
         return None
     
-    with open(version_path, "r", encoding="utf-8") as f:
-        return f.read()
+    return _read_version(history_dir, version_id)
 
 def restore_version(note_path: pathlib.Path, version_ref: Union[str, int]) -> bool:
     """Restore a note to a previous version.
@@ -174,22 +346,30 @@ def restore_version(note_path: pathlib.Path, version_ref: Union[str, int]) -> bo
     history_dir = get_history_dir() / note_name
     
     # Resolve the version reference to a specific version ID
-    version_id = resolve_version_id(note_path, version_ref)
+    version_id = _resolve_in(history_dir, version_ref)
     if not version_id:
         console.print(f"[red]Version {version_ref} not found for note: {note_name}[/red]")
         return False
     
+    # A version stored in full is copied as is; a packed one has to be rebuilt
     version_path = history_dir / f"{version_id}.md"
+    content = None
     if not os.path.exists(version_path):
-        console.print(f"[red]Version {version_id} not found for note: {note_name}[/red]")
-        return False
+        content = _read_version(history_dir, version_id)
+        if content is None:
+            console.print(f"[red]Version {version_id} not found for note: {note_name}[/red]")
+            return False
     
     try:
         # Save current state before restoring (without recursion)
         save_backup_version(note_path)
         
-        # Copy version content to note
-        shutil.copy2(version_path, note_path)
+        if content is None:
+            # Content only, no metadata; on Linux the bytes are copied in the kernel
+            shutil.copyfile(version_path, note_path)
+        else:
+            with open(note_path, "w", encoding="utf-8") as f:
+                f.write(content)
         console.print(f"[green]Restored note to version: {version_id}[/green]")
         return True
     except Exception as e:
@@ -208,32 +388,185 @@ def save_backup_version(note_path: pathlib.Path) -> None:
     with open(note_path, "r", encoding="utf-8") as f:
         content = f.read()
     
-    # Create backup version ID
-    backup_id = f"backup_{datetime.datetime.now().strftime('%Y%m%d%H%M%S')}"
-    
     # Get the stem name of the note
     note_name = note_path.stem
     
     # Create history directory for this note
-    history_dir = get_history_dir() / note_name
-    os.makedirs(history_dir, exist_ok=True)
+    history_dir = _ensure_note_history_dir(note_name)
+    
+    # Create backup version ID
+    now = datetime.datetime.now()
+    backup_id = _new_version_id(history_dir, f"backup_{now.strftime('%Y%m%d%H%M%S')}")
     
     # Save content to backup file
     backup_path = history_dir / f"{backup_id}.md"
-    with open(backup_path, "w", encoding="utf-8") as f:
-        f.write(content)
+    _clear_version_caches()
+    _write_atomic(backup_path, content)
     
     # Save metadata
     metadata = {
         "version_id": backup_id,
-        "timestamp": datetime.datetime.now().isoformat(),
+        "timestamp": now.isoformat(),
         "message": "Automatic backup before restore",
         "note_path": str(note_path),
     }
     
-    metadata_path = history_dir / f"{backup_id}.json"
-    with open(metadata_path, "w", encoding="utf-8") as f:
-        json.dump(metadata, f, indent=2)
+    _append_log(history_dir, metadata)
+    _share_unchanged_predecessor(history_dir, backup_id, content)
+
+# Above this size, diffs are left to git, whose C differ is much faster than difflib
+GIT_DIFF_THRESHOLD = 64 * 1024
+
+# Settings that would make git's diff read differently from difflib's
+GIT_DIFF_CONFIG = (
+    "color.diff=false",
+    "core.quotePath=false",
+    "diff.algorithm=myers",
+    "diff.interHunkContext=0",
+    "diff.mnemonicPrefix=false",
+    "diff.noprefix=false",
+    "diff.relative=false",
+    "diff.suppressBlankEmpty=false",
+)
+
+def _git_diff(content1: str, content2: str) -> Optional[List[str]]:
+    """Return the hunks of a unified diff computed by git, or None if git can't be used."""
+    import shutil
+    import subprocess
+    import tempfile
+    
+    git = shutil.which("git")
+    if git is None:
+        return None
+    
+    with tempfile.TemporaryDirectory(prefix="numen-diff-") as temp_dir:
+        paths = []
+        for name, content in (("a", content1), ("b", content2)):
+            path = os.path.join(temp_dir, name)
+            with open(path, "w", encoding="utf-8", newline="") as f:
+                f.write(content)
+            paths.append(path)
+        # Ignore the user's git config and environment, which can change the
+        # diff's format or hunks, and pin the settings difflib's output relies on
+        env = {key: value for key, value in os.environ.items() if not key.startswith("GIT_")}
+        env["GIT_CONFIG_NOSYSTEM"] = "1"
+        env["GIT_CONFIG_GLOBAL"] = os.devnull
+        overrides = []
+        for setting in GIT_DIFF_CONFIG:
+            overrides += ["-c", setting]
+        try:
+            result = subprocess.run(
+                [git, *overrides, "diff", "--no-index", "--no-color", "--no-ext-diff", "--no-textconv",
+                 "--text", "--minimal", "-U3", "--", *paths],
+                capture_output=True,
+                check=False,
+                cwd=temp_dir,
+                env=env,
+            )
+        except OSError:
+            return None
+    
+    # Exit status 1 means the files differ; anything else besides 0 is an error
+    if result.returncode not in (0, 1):
+        return None
+    
+    hunks: List[str] = []
+    for line in result.stdout.decode("utf-8", errors="replace").splitlines():
+        if line.startswith("@@"):
+            # Drop the function context git appends, which difflib doesn't produce
+            line = line[:line.index("@@", 2) + 2]
+        elif not hunks or line.startswith("\\"):
+            # Skip git's file headers and its "No newline at end of file" notes
+            continue
+        hunks.append(line)
+    return hunks
+
+DIFF_CONTEXT = 3
+# The start line numbers in a hunk header like "@@ -12,4 +12,5 @@"
+_HUNK_START = re.compile(r"(?<=[-+])\d+")
+
+def _can_trim(lines1: List[str], lines2: List[str], prefix: int, suffix: int, kept: int) -> bool:
+    """Check that diffing only the changed middle, plus context, gives the same diff as the whole note.
+    
+    difflib matches the longest run of equal lines anywhere, so a line the shared
+    start and end have in common with each other or with the middle can pull the
+    matching away from them. It also treats lines repeated in over 1% of a long
+    note as noise, which depends on the length of what is compared.
+    """
+    from collections import Counter
+    
+    head = set(lines1[:prefix])
+    tail = set(lines1[len(lines1) - suffix:])
+    middle = set(lines1[prefix:len(lines1) - suffix])
+    middle.update(lines2[prefix:len(lines2) - suffix])
+    if not head.isdisjoint(tail) or not middle.isdisjoint(head) or not middle.isdisjoint(tail):
+        return False
+    
+    # No changed line may be frequent enough to count as noise in either comparison
+    most = max(Counter(lines2[prefix:len(lines2) - suffix]).values(), default=0)
+    return all(length < 200 or most <= length // 100 + 1 for length in (len(lines2), kept))
+
+@functools.lru_cache(maxsize=16)
+def _diff_versions(history_dir: str, version_id1: str, version_id2: str) -> Optional[Tuple[str, ...]]:
+    """Return the unified diff between two stored versions, or None if either is missing.
+    
+    Cached like _read_version_file, since neither side can change.
+    """
+    import difflib
+    
+    content1 = _read_version_file(history_dir, version_id1)
+    content2 = content1 if version_id2 == version_id1 else _read_version_file(history_dir, version_id2)
+    
+    if content1 is None or content2 is None:
+        return None
+    if content1 == content2:
+        return ()
+    
+    fromfile = f"Version {version_id1}"
+    tofile = f"Version {version_id2}"
+    
+    if max(len(content1), len(content2)) > GIT_DIFF_THRESHOLD:
+        hunks = _git_diff(content1, content2)
+        if hunks is not None:
+            return (f"--- {fromfile}", f"+++ {tofile}", *hunks) if hunks else ()
+    
+    # Split content into lines
+    lines1 = content1.splitlines()
+    lines2 = content2.splitlines()
+    
+    # Leave lines both versions share at the start and end out of the
+    # matching when that can't change the result, keeping enough of them
+    # for the context around each change
+    prefix = 0
+    for line1, line2 in zip(lines1, lines2):
+        if line1 != line2:
+            break
+        prefix += 1
+    suffix = 0
+    limit = min(len(lines1), len(lines2)) - prefix
+    while suffix < limit and lines1[-1 - suffix] == lines2[-1 - suffix]:
+        suffix += 1
+    start = max(0, prefix - DIFF_CONTEXT)
+    end = max(0, suffix - DIFF_CONTEXT)
+    if (start or end) and not _can_trim(lines1, lines2, prefix, suffix, len(lines2) - start - end):
+        start = end = 0
+    
+    # Get unified diff
+    diff = difflib.unified_diff(
+        lines1[start:len(lines1) - end], lines2[start:len(lines2) - end],
+        fromfile=fromfile,
+        tofile=tofile,
+        n=DIFF_CONTEXT,
+        lineterm=""
+    )
+    if not start:
+        return tuple(diff)
+    
+    # Shift hunk line numbers back to positions in the whole note
+    def shift(match: re.Match) -> str:
+        return str(int(match.group(0)) + start)
+    
+    return tuple(_HUNK_START.sub(shift, line) if line.startswith("@@") else line for line in diff)
 
 def compare_versions(note_name: str, version_ref1: Union[str, int], version_ref2: Union[str, int]) -> List[str]:
     """Compare two versions of a note and return the differences.
@@ -247,36 +580,20 @@ def compare_versions(note_name: str, version_ref1: Union[str, int], version_ref2
         List of difference strings
     """
     try:
-        import difflib
-        
         # Resolve version references to specific version IDs
-        note_path = pathlib.Path(os.path.join(get_history_dir().parent, "notes", f"{note_name}.md"))
+        history_dir = get_history_dir() / note_name
         
-        version_id1 = resolve_version_id(note_path, version_ref1)
-        version_id2 = resolve_version_id(note_path, version_ref2)
+        version_id1 = _resolve_in(history_dir, version_ref1)
+        version_id2 = _resolve_in(history_dir, version_ref2)
         
         if not version_id1 or not version_id2:
             return ["Error: One or both versions not found"]
         
-        content1 = get_version_content(note_name, version_id1)
-        content2 = get_version_content(note_name, version_id2)
-        
-        if content1 is None or content2 is None:
+        diff = _diff_versions(str(history_dir), version_id1, version_id2)
+        if diff is None:
             return ["Error: One or both versions not found"]
         
-        # Split content into lines
-        lines1 = content1.splitlines()
-        lines2 = content2.splitlines()
-        
-        # Get unified diff
-        diff = list(difflib.unified_diff(
-            lines1, lines2, 
-            fromfile=f"Version {version_id1}", 
-            tofile=f"Version {version_id2}",
-            lineterm=""
-        ))
-        
-        return diff
+        return list(diff)
     except ImportError:
         return ["Error: difflib module not available"]
     except Exception as e:
@@ -288,6 +605,8 @@ def display_versions(versions: List[Dict]) -> None:
     Args:
         versions: List of version metadata dictionaries
     """
+    from rich.table import Table
+    
     table = Table(title="📚 Version History")
     table.add_column("Index", style="blue", justify="right")
     table.add_column("Version", style="cyan")
@@ -298,10 +617,10 @@ def display_versions(versions: List[Dict]) -> None:
     for i, version in enumerate(versions):
         version_id = version["version_id"]
         
-        # Format timestamp
-        timestamp = datetime.datetime.fromisoformat(version["timestamp"])
-        date_str = timestamp.strftime("%Y-%m-%d")
-        time_str = timestamp.strftime("%H:%M:%S")
+        # Timestamps are ISO 8601, so the date and time can be sliced out without parsing
+        timestamp = version["timestamp"]
+        date_str = timestamp[:10]
+        time_str = timestamp[11:19]
         
         message = version["message"]
         
@@ -330,6 +649,8 @@ def remove_history(note_path: pathlib.Path) -> bool:
     
     try:
         shutil.rmtree(history_dir)
+        forget_dir(history_dir)
+        _clear_version_caches()
         console.print(f"[green]History removed for note: {note_name}[/green]")
         return True
     except Exception as e:
@@ -1,25 +1,31 @@
 """Note management for Numen."""
 
+import bisect
 import datetime
+import fnmatch
+import functools
+import importlib.util
 import os
 import pathlib
 import subprocess
-from typing import Dict, List, Optional, Set, Union
+from typing import Any, Dict, List, Optional, Pattern, Set, Tuple, Union
 
 import frontmatter
-import yaml
 from rich.console import Console
-from rich.table import Table
 
 from numen.config import get_editor, get_notes_dir
+from numen.utils import dumps_post, ensure_dir, load_post_cached, open_in_editor, slugify, split_sections, write_text_atomic
 
 console = Console()
 
+# Note identifiers already resolved in this process, keyed by (notes_dir, identifier)
+_resolved: Dict[Tuple[str, str], pathlib.Path] = {}
+
 
 def create_note(title: str, template: Optional[str] = None) -> pathlib.Path:
     """Create a new note with the given title."""
     date_prefix = datetime.datetime.now().strftime("%Y-%m-%d")
-    slug = "".join(c if c.isalnum() or c in ['-', '_'] else '-' for c in title.lower().replace(" ", "-"))
+    slug = slugify(title)
     filename = f"{date_prefix}-{slug}.md"
     
     metadata = {
@@ -42,65 +48,93 @@ def create_note(title: str, template: Optional[str] = None) -> pathlib.Path:
             console.print("[yellow]Templates module not available. Creating note without template.[/yellow]")
     
     note = frontmatter.Post(content, **metadata)
-    content_str = frontmatter.dumps(note)
+    content_str = dumps_post(note)
     
     notes_dir = get_notes_dir()
-    os.makedirs(notes_dir, exist_ok=True)
+    ensure_dir(notes_dir)
     
     note_path = notes_dir / filename
     try:
-        with open(note_path, "w", encoding="utf-8") as f:
-            f.write(content_str)
+        note_path.write_text(content_str, encoding="utf-8")
     except Exception as e:
         console.print(f"[red]Error creating note: {e}[/red]")
         raise
     
+    _record_meta(note_path, content_str)
+    # A new note can be a better partial-name match than a cached one
+    _resolved.clear()
     return note_path
 
 
+def _record_meta(note_path: pathlib.Path, content: Optional[str] = None) -> None:
+    """Update the note metadata cache after writing a note."""
+    from numen.notes.meta_cache import record
+    
+    record(note_path, content.encode("utf-8") if content is not None else None)
+
+
+def scan_note_entries(notes_dir: Optional[pathlib.Path] = None) -> List[os.DirEntry]:
+    """List the note files in notes_dir with a single directory scan.
+    
+    Matches notes_dir.glob("*.md"), which skips hidden files, but the
+    entries carry their name, path and file type without extra system calls.
+    """
+    if notes_dir is None:
+        notes_dir = get_notes_dir()
+    try:
+        with os.scandir(notes_dir) as it:
+            return [
+                entry for entry in it
+                if entry.name.endswith(".md") and not entry.name.startswith(".") and entry.is_file()
+            ]
+    except FileNotFoundError:
+        return []
+
+
 def list_notes(tag: Optional[str] = None) -> List[pathlib.Path]:
     """List all notes, optionally filtered by tag."""
     notes_dir = get_notes_dir()
-    os.makedirs(notes_dir, exist_ok=True)
+    ensure_dir(notes_dir)
     
-    all_notes = list(notes_dir.glob("*.md"))
+    entries = scan_note_entries(notes_dir)
     
     if tag is None:
-        return all_notes
+        return [pathlib.Path(entry.path) for entry in entries]
     
-    filtered_notes = []
-    for note_path in all_notes:
-        with open(note_path, "r", encoding="utf-8") as f:
-            post = frontmatter.load(f)
-            note_tags = post.get("tags", [])
-            if tag in note_tags:
-                filtered_notes.append(note_path)
+    from numen.notes.meta_cache import load_many
     
-    return filtered_notes
+    return [
+        pathlib.Path(entry.path) for entry, meta in zip(entries, load_many(entries))
+        if meta is not None and tag in meta["tags"]
+    ]
 
 
 def display_notes(notes: List[pathlib.Path]) -> None:
     """Display a list of notes in a rich table."""
+    from rich.table import Table
+    
     table = Table(title="📚 Numen Notes")
     table.add_column("Date", style="cyan")
     table.add_column("Title", style="green")
     table.add_column("Tags", style="yellow")
     
-    for note_path in notes:
-        with open(note_path, "r", encoding="utf-8") as f:
-            post = frontmatter.load(f)
-            
-        date = post.get("date", "")
-        if isinstance(date, datetime.datetime):
-            date_str = date.strftime("%Y-%m-%d")
-        else:
-            try:
-                date_str = datetime.datetime.fromisoformat(date).strftime("%Y-%m-%d")
-            except (ValueError, TypeError):
-                date_str = str(date)
+    from numen.notes.meta_cache import load_many
+    
+    def report(note_path: pathlib.Path, error: str) -> None:
+        console.print(f"[red]Error reading {note_path.name}: {error}[/red]")
+    
+    for meta in load_many(notes, on_error=report):
+        if meta is None:
+            continue
         
-        title = post.get("title", note_path.stem)
-        tags = post.get("tags", [])
+        date = meta["date"]
+        try:
+            date_str = datetime.datetime.fromisoformat(date).strftime("%Y-%m-%d")
+        except (ValueError, TypeError):
+            date_str = str(date)
+        
+        title = meta["title"]
+        tags = meta["tags"]
         tags_str = ", ".join([f"#{tag}" for tag in tags])
         
         table.add_row(date_str, title, tags_str)
@@ -108,8 +142,12 @@ def display_notes(notes: List[pathlib.Path]) -> None:
     console.print(table)
 
 
-def edit_note(note_identifier: str) -> bool:
-    """Open a note in the configured editor."""
+def edit_note(note_identifier: str, replace_process: bool = False) -> bool:
+    """Open a note in the configured editor.
+    
+    With replace_process the editor replaces the current process, so this
+    only returns on failure; see open_in_editor.
+    """
     from numen.config import get_editor
     
     notes_dir = get_notes_dir()
@@ -132,60 +170,215 @@ def edit_note(note_identifier: str) -> bool:
         pass
     
     editor = get_editor()
-    subprocess.run([editor, str(note_path)], check=False)
+    if replace_process:
+        from numen.notes.meta_cache import flush
+        
+        # The metadata cache is normally saved at exit, which exec skips
+        flush()
+    if not open_in_editor(editor, note_path, replace_process):
+        return False
+    _record_meta(note_path)
     return True
 
 
 def resolve_note_path(note_identifier: str) -> Optional[pathlib.Path]:
-    """Resolve a note identifier to a full path."""
+    """Resolve a note identifier to a full path.
+    
+    Results are remembered for the rest of the process, so commands that
+    resolve the same note several times only search the directory once.
+    """
     notes_dir = get_notes_dir()
-    os.makedirs(notes_dir, exist_ok=True)
+    key = (str(notes_dir), note_identifier)
+    cached = _resolved.get(key)
+    if cached is not None and cached.exists():
+        return cached
+    
+    path = _resolve_note_path(notes_dir, note_identifier)
+    if path is not None:
+        _resolved[key] = path
+    return path
+
+
+def _resolve_note_path(notes_dir: pathlib.Path, note_identifier: str) -> Optional[pathlib.Path]:
+    ensure_dir(notes_dir)
     
     if os.path.isabs(note_identifier):
-        path = pathlib.Path(note_identifier)
-        if path.exists():
-            return path
+        if os.path.exists(note_identifier):
+            return pathlib.Path(note_identifier)
         return None
     
-    direct_path = notes_dir / note_identifier
-    if direct_path.exists():
-        return direct_path
-    
-    if not note_identifier.endswith(".md"):
-        md_path = notes_dir / f"{note_identifier}.md"
-        if md_path.exists():
-            return md_path
+    # One stat per candidate on plain strings; a Path is built only for the match
+    direct_path = os.path.join(notes_dir, note_identifier)
+    candidates = [direct_path] if note_identifier.endswith(".md") else [direct_path, f"{direct_path}.md"]
+    for candidate in candidates:
+        if os.path.exists(candidate):
+            return pathlib.Path(candidate)
     
-    candidates = []
     try:
-        candidates = sorted(
-            [p for p in notes_dir.glob(f"*{note_identifier}*.md")],
-            key=lambda p: p.stat().st_mtime,
-            reverse=True
+        # Same matching as notes_dir.glob(f"*{note_identifier}*.md"), over one directory scan;
+        # only the most recently modified match is needed, so there's nothing to sort
+        pattern = f"*{note_identifier}*.md"
+        newest = max(
+            (entry for entry in scan_note_entries(notes_dir) if fnmatch.fnmatch(entry.name, pattern)),
+            key=lambda entry: entry.stat().st_mtime_ns,
+            default=None,
         )
     except Exception as e:
         console.print(f"[red]Error finding notes: {e}[/red]")
+        return None
     
-    if candidates:
-        return candidates[0]
+    if newest is not None:
+        return pathlib.Path(newest.path)
     
     return None
 
 
+@functools.lru_cache(maxsize=1)
+def _find_ripgrep() -> Optional[str]:
+    """Return the path of the rg executable, looked up on PATH once per process."""
+    import shutil
+    
+    return shutil.which("rg")
+
+
+def _ripgrep_matches(query: str, notes_dir: pathlib.Path) -> Optional[Set[str]]:
+    """Return the paths of notes containing query using ripgrep, or None if it can't be used."""
+    rg = _find_ripgrep()
+    if rg is None:
+        return None
+    
+    try:
+        result = subprocess.run(
+            # --no-config keeps a user's RIPGREPRC from changing what matches
+            [rg, "--no-config", "--files-with-matches", "--null", "--fixed-strings", "--ignore-case",
+             "--no-ignore", "--no-messages", "--max-depth", "1", "--glob", "*.md",
+             "--", query, str(notes_dir)],
+            capture_output=True,
+            check=False,
+        )
+    except OSError:
+        return None
+    
+    # Exit status 1 means no matches; anything else besides 0 is an error
+    if result.returncode not in (0, 1):
+        return None
+    return {os.path.normpath(os.fsdecode(path)) for path in result.stdout.split(b"\0") if path}
+
+
+# Below this many notes, the fallback search reads them one after another
+SEARCH_THREAD_THRESHOLD = 64
+
+
+def _search_pattern(query: str) -> Optional[Pattern[bytes]]:
+    """Return a compiled case-insensitive bytes pattern for an ASCII query, or None."""
+    if not query.isascii():
+        return None
+    import re
+    
+    # A bytes pattern ignores case for ASCII only, which suffices for an ASCII query
+    return re.compile(re.escape(query.encode("ascii")), re.IGNORECASE)
+
+
+def _note_contains(path: str, query: str, pattern: Optional[Pattern[bytes]]) -> bool:
+    """Return True if the note at path contains query, ignoring case."""
+    if pattern is None:
+        with open(path, "r", encoding="utf-8") as f:
+            return query.lower() in f.read().lower()
+    
+    # Search the raw bytes in place rather than decoding a lowercased copy
+    import mmap
+    
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            # mmap refuses empty files
+            return not query
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return pattern.search(mm) is not None
+
+
 def search_notes(query: str) -> List[pathlib.Path]:
-    """Search for notes containing the query string."""
+    """Search for notes containing the query string.
+    
+    Uses ripgrep when it is on PATH and falls back to reading each note.
+    """
     notes_dir = get_notes_dir()
-    all_notes = list(notes_dir.glob("*.md"))
-    matching_notes = []
+    entries = scan_note_entries(notes_dir)
     
-    for note_path in all_notes:
-        with open(note_path, "r", encoding="utf-8") as f:
-            content = f.read().lower()
-            
-        if query.lower() in content:
-            matching_notes.append(note_path)
+    matches = _ripgrep_matches(query, notes_dir)
+    if matches is not None:
+        return [pathlib.Path(entry.path) for entry in entries if os.path.normpath(entry.path) in matches]
     
-    return matching_notes
+    paths = [entry.path for entry in entries]
+    contains = functools.partial(_note_contains, query=query, pattern=_search_pattern(query))
+    if len(paths) >= SEARCH_THREAD_THRESHOLD:
+        # Opening and mapping files releases the GIL, so threads overlap the I/O
+        from concurrent.futures import ThreadPoolExecutor
+        
+        with ThreadPoolExecutor(max_workers=min(32, (os.cpu_count() or 1) * 4)) as executor:
+            found = list(executor.map(contains, paths))
+    else:
+        found = [contains(path) for path in paths]
+    
+    return [pathlib.Path(path) for path, hit in zip(paths, found) if hit]
+
+
+def _hyperscan_database(queries: List[str]) -> Optional[Any]:
+    """Compile queries into one case-insensitive Hyperscan database, or return None.
+    
+    Hyperscan is optional; it matches every query in a single pass over each note.
+    """
+    if not importlib.util.find_spec("hyperscan"):
+        return None
+    import re
+    
+    import hyperscan
+    
+    database = hyperscan.Database(mode=hyperscan.HS_MODE_BLOCK)
+    flags = hyperscan.HS_FLAG_CASELESS | hyperscan.HS_FLAG_SINGLEMATCH | hyperscan.HS_FLAG_UTF8 | hyperscan.HS_FLAG_UCP
+    database.compile(
+        expressions=[re.escape(query).encode("utf-8") for query in queries],
+        ids=list(range(len(queries))),
+        elements=len(queries),
+        flags=[flags] * len(queries),
+    )
+    return database
+
+
+def search_notes_many(queries: List[str]) -> Dict[str, List[pathlib.Path]]:
+    """Search for notes containing each of several query strings.
+    
+    Returns the matching notes for every query, in directory order. With
+    hyperscan installed each note is read and scanned once for all queries;
+    otherwise each query is searched as in search_notes.
+    """
+    results: Dict[str, List[pathlib.Path]] = {query: [] for query in queries}
+    # An empty query matches every note, and Hyperscan rejects empty patterns
+    patterns = [query for query in results if query]
+    
+    try:
+        database = _hyperscan_database(patterns) if patterns else None
+    except Exception:
+        database = None
+    if database is None:
+        for query in results:
+            results[query] = search_notes(query)
+        return results
+    
+    found: Set[int] = set()
+    
+    def on_match(query_id: int, start: int, end: int, flags: int, context: Any) -> None:
+        found.add(query_id)
+    
+    for entry in scan_note_entries(get_notes_dir()):
+        path = pathlib.Path(entry.path)
+        found.clear()
+        with open(path, "rb") as f:
+            database.scan(f.read(), match_event_handler=on_match)
+        for query_id in found:
+            results[patterns[query_id]].append(path)
+        if "" in results:
+            results[""].append(path)
+    return results
 
 
 def update_tags(note_identifier: str, add_tags: List[str], remove_tags: List[str]) -> bool:
@@ -196,43 +389,80 @@ def update_tags(note_identifier: str, add_tags: List[str], remove_tags: List[str
         return False
     
     try:
-        with open(note_path, "r", encoding="utf-8") as f:
-            post = frontmatter.load(f)
+        post = load_post_cached(note_path)
     except Exception as e:
         console.print(f"[red]Error reading note: {e}[/red]")
         return False
     
-    current_tags = set(post.get("tags", []))
+    tags = list(post.get("tags", []))
+    
+    # Tags written by this function are sorted and unique, so new ones can be
+    # inserted in place; tags edited by hand get sorted and deduplicated
+    if all(a < b for a, b in zip(tags, tags[1:])):
+        for tag in add_tags:
+            i = bisect.bisect_left(tags, tag)
+            if i == len(tags) or tags[i] != tag:
+                tags.insert(i, tag)
+    else:
+        tags = sorted(set(tags).union(add_tags))
     
-    for tag in add_tags:
-        current_tags.add(tag)
+    removed = set(remove_tags)
+    post["tags"] = [tag for tag in tags if tag not in removed]
     
-    for tag in remove_tags:
-        if tag in current_tags:
-            current_tags.remove(tag)
+    content_str = dumps_post(post)
+    try:
+        write_text_atomic(note_path, content_str)
+    except Exception as e:
+        console.print(f"[red]Error writing note: {e}[/red]")
+        return False
     
-    post["tags"] = sorted(list(current_tags))
+    _record_meta(note_path, content_str)
+    return True
+
+
+def _append_note_content(note_path: pathlib.Path, text: str) -> bool:
+    """Append text to the end of a note without parsing or re-serializing it.
     
+    Trailing whitespace is trimmed first, so the note's content ends up as
+    if it had been loaded, appended to and dumped again, while the
+    frontmatter stays exactly as it was written.
+    """
     try:
-        with open(note_path, "w", encoding="utf-8") as f:
-            f.write(frontmatter.dumps(post))
+        with open(note_path, "r+b") as f:
+            end = f.seek(0, os.SEEK_END)
+            while end > 0:
+                start = max(0, end - 4096)
+                f.seek(start)
+                tail = f.read(end - start)
+                stripped = tail.rstrip()
+                if stripped:
+                    end = start + len(stripped)
+                    break
+                end = start
+            f.truncate(end)
+        with open(note_path, "a", encoding="utf-8") as f:
+            f.write(text)
     except Exception as e:
         console.print(f"[red]Error writing note: {e}[/red]")
         return False
     
+    _record_meta(note_path)
     return True
 
 
-def get_section_content(note_identifier: str, section: Optional[int] = None) -> Optional[str]:
-    """Get content from a specific section of a note, or the entire note if section is None."""
+def get_section_content(note_identifier: str, section: Optional[int] = None) -> Optional[Tuple[pathlib.Path, str]]:
+    """Get content from a specific section of a note, or the entire note if section is None.
+    
+    Returns the resolved note path along with the content, so callers can
+    pass it on to update_note_content without resolving the note again.
+    """
     note_path = resolve_note_path(note_identifier)
     if note_path is None:
         console.print(f"[red]Note not found: {note_identifier}[/red]")
         return None
     
     try:
-        with open(note_path, "r", encoding="utf-8") as f:
-            post = frontmatter.load(f)
+        post = load_post_cached(note_path)
     except Exception as e:
         console.print(f"[red]Error loading note: {e}[/red]")
         return None
@@ -240,50 +470,39 @@ def get_section_content(note_identifier: str, section: Optional[int] = None) ->
     content = post.content
     
     if section is None:
-        return content
+        return note_path, content
     
-    sections = []
-    current_section = []
-    for line in content.split("\n"):
-        if line.startswith("#"):
-            if current_section:
-                sections.append("\n".join(current_section))
-                current_section = []
-        current_section.append(line)
-    
-    if current_section:
-        sections.append("\n".join(current_section))
-    
-    if not sections and content.strip():
-        sections = [content.strip()]
-    
-    if not sections:
-        console.print("[yellow]Note is empty. Nothing to process.[/yellow]")
-        return None
-    elif section < 0 or section >= len(sections):
+    sections = split_sections(content)
+    if section < 0 or section >= len(sections):
         console.print(f"[red]Section {section} not found. Note has {len(sections)} sections (0-{len(sections)-1}).[/red]")
         return None
     
-    return sections[section]
+    return note_path, sections[section]
 
 
-def update_note_content(note_identifier: str, new_content: str, section: Optional[int] = None, preserve_original: bool = True) -> bool:
+def update_note_content(note_identifier: Union[str, pathlib.Path], new_content: str, section: Optional[int] = None, preserve_original: bool = True) -> bool:
     """Update the content of a note, either entirely or for a specific section.
     
     Args:
-        note_identifier: The note to update
+        note_identifier: The note to update, or its already resolved path
         new_content: The new content to add
         section: Optional section index to update (if None, updates entire note)
         preserve_original: If True, keeps the original text and appends AI-generated content
     """
-    note_path = resolve_note_path(note_identifier)
+    note_path: Optional[pathlib.Path]
+    if isinstance(note_identifier, pathlib.Path):
+        note_path = note_identifier
+    else:
+        note_path = resolve_note_path(note_identifier)
     if note_path is None:
         console.print(f"[red]Note not found: {note_identifier}")
         return False
     
+    if section is None and preserve_original:
+        return _append_note_content(note_path, f"\n\n## AI-Generated Content\n\n{new_content}")
+    
     try:
-        with open(note_path, "r", encoding="utf-8") as f:
-            post = frontmatter.load(f)
+        post = load_post_cached(note_path)
     except Exception as e:
         console.print(f"[red]Error reading note: {e}[/red]")
         return False
@@ -296,25 +515,8 @@ def update_note_content(note_identifier: str, new_content: str, section: Optiona
         else:
             post.content = new_content
     else:
-        sections = []
-        current_section = []
-        for line in content.split("\n"):
-            if line.startswith("#"):
-                if current_section:
-                    sections.append("\n".join(current_section))
-                    current_section = []
-            current_section.append(line)
-        
-        if current_section:
-            sections.append("\n".join(current_section))
-        
-        if not sections and content.strip():
-            sections = [content]
-            
-        if not sections:
-            console.print("[yellow]Note is empty. Cannot update.[/yellow]")
-            return False
-        elif section < 0 or section >= len(sections):
+        sections = split_sections(content)
+        if section < 0 or section >= len(sections):
             console.print(f"[red]Section {section} not found. Note has {len(sections)} sections (0-{len(sections)-1}).[/red]")
             return False
         
@@ -324,13 +526,15 @@ def update_note_content(note_identifier: str, new_content: str, section: Optiona
         else:
             sections[section] = new_content
         
-        post.content = "\n\n".join(sections)
+        # Sections were split at single newlines, so joining with one keeps the rest of the note as it was
+        post.content = "\n".join(sections)
     
+    content_str = dumps_post(post)
     try:
-        with open(note_path, "w", encoding="utf-8") as f:
-            f.write(frontmatter.dumps(post))
+        write_text_atomic(note_path, content_str)
     except Exception as e:
         console.print(f"[red]Error writing note: {e}[/red]")
         return False
     
+    _record_meta(note_path, content_str)
     return True
@@ -0,0 +1,201 @@
+"""Persistent cache of note metadata.
+
+Commands like stats and list only need the title, date, tags and word count
+of each note. Parsing every note's frontmatter for that is the bulk of their
+run time, so the extracted fields are kept in a JSON file keyed by path and
+reused for as long as the file's mtime and size are unchanged.
+"""
+
+import atexit
+import datetime
+import os
+import pathlib
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, TypeVar, Union
+
+from numen.config import get_cache_dir
+from numen.utils import (
+    count_words,
+    json_dumps,
+    json_loads,
+    open_atomic,
+    parse_frontmatter,
+)
+
+Meta = Dict[str, Any]
+NoteEntry = TypeVar("NoteEntry", os.DirEntry, pathlib.Path)
+
+_entries: Optional[Dict[str, Meta]] = None
+_dirty = False
+_lock = threading.Lock()
+
+
+def _cache_path() -> pathlib.Path:
+    return get_cache_dir() / "notes_meta.json"
+
+
+def _load_entries() -> Dict[str, Meta]:
+    global _entries
+    if _entries is None:
+        try:
+            with open(_cache_path(), "rb") as f:
+                data = f.read()
+            _entries = json_loads(data)
+        except (OSError, ValueError):
+            _entries = {}
+        atexit.register(flush)
+    return _entries
+
+
+def _extract(path: Union[str, os.PathLike], data: Optional[bytes] = None) -> Meta:
+    """Parse a note and pull out the fields the cache keeps.
+
+    Only the frontmatter goes through YAML; the body is just counted.
+    Pass data when the note's bytes are already in hand.
+    """
+    if data is None:
+        with open(path, "rb") as f:
+            data = f.read()
+    metadata, body_start = parse_frontmatter(data)
+
+    date = metadata.get("date", "")
+    if isinstance(date, (datetime.date, datetime.datetime)):
+        date = date.isoformat()
+
+    title = metadata.get("title")
+    tags = metadata.get("tags", []) or []
+    return {
+        "title": (
+            str(title)
+            if title is not None
+            else os.path.splitext(os.path.basename(path))[0]
+        ),
+        "date": date if isinstance(date, str) else str(date),
+        "tags": [str(tag) for tag in tags] if isinstance(tags, list) else [str(tags)],
+        "word_count": count_words(data, body_start),
+    }
+
+
+# Below this many cache misses, starting worker processes costs more than it saves
+PROCESS_POOL_THRESHOLD = 50
+
+
+def _extract_safe(path: str) -> Tuple[Optional[Meta], Optional[str]]:
+    """Run _extract in a worker process, returning the error message instead of raising."""
+    try:
+        return _extract(path), None
+    except Exception as e:
+        return None, str(e)
+
+
+def load_many(
+    entries: Sequence[NoteEntry],
+    on_error: Optional[Callable[[NoteEntry, str], None]] = None,
+) -> List[Optional[Meta]]:
+    """Return the metadata of many notes at once, in the order of entries.
+
+    entries may be scandir entries (whose cached stat is reused) or paths.
+    Cached entries are returned as is. When many notes need parsing, YAML
+    parsing is CPU-bound, so it is spread over a process pool. A note that
+    can't be read gives None, after on_error is called with its message.
+    """
+    global _dirty
+    results: List[Optional[Meta]] = [None] * len(entries)
+    misses = []
+    with _lock:
+        cached = _load_entries()
+        for i, entry in enumerate(entries):
+            try:
+                stat = entry.stat()
+            except OSError as e:
+                if on_error is not None:
+                    on_error(entry, str(e))
+                continue
+            hit = cached.get(os.path.abspath(entry))
+            if (
+                hit is not None
+                and hit["mtime_ns"] == stat.st_mtime_ns
+                and hit["size"] == stat.st_size
+            ):
+                results[i] = hit["meta"]
+            else:
+                misses.append((i, entry, stat))
+
+    if not misses:
+        return results
+
+    paths = [os.fspath(entry) for _, entry, _ in misses]
+    if len(misses) >= PROCESS_POOL_THRESHOLD:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor() as executor:
+            parsed = list(executor.map(_extract_safe, paths, chunksize=32))
+    else:
+        parsed = [_extract_safe(path) for path in paths]
+
+    with _lock:
+        cached = _load_entries()
+        for (i, entry, stat), (meta, error) in zip(misses, parsed):
+            if meta is None:
+                if on_error is not None:
+                    on_error(entry, str(error))
+                continue
+            results[i] = meta
+            cached[os.path.abspath(entry)] = {
+                "mtime_ns": stat.st_mtime_ns,
+                "size": stat.st_size,
+                "meta": meta,
+            }
+            _dirty = True
+    return results
+
+
+def record(path: Union[str, pathlib.Path], data: Optional[bytes] = None) -> None:
+    """Refresh the cached entry for path right after the note was written.
+
+    Commands that write notes call this so the next list or stats finds the
+    entry current. data is the text just written, which saves re-reading it.
+    """
+    global _dirty
+    path = pathlib.Path(path)
+    try:
+        stat = os.stat(path)
+        meta = _extract(path, data)
+    except Exception:
+        forget(path)
+        return
+
+    with _lock:
+        _load_entries()[os.path.abspath(path)] = {
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "meta": meta,
+        }
+        _dirty = True
+
+
+def forget(path: Union[str, pathlib.Path]) -> None:
+    """Drop the cached entry for path, e.g. after the note is deleted."""
+    global _dirty
+    key = os.path.abspath(path)
+    with _lock:
+        if _load_entries().pop(key, None) is not None:
+            _dirty = True
+
+
+def flush() -> None:
+    """Write the cache to disk if it changed; runs automatically at exit."""
+    global _dirty
+    with _lock:
+        if not _dirty or _entries is None:
+            return
+        path = _cache_path()
+        try:
+            data = json_dumps(_entries)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Replace the file in one step so a crash never leaves half a cache
+            with open_atomic(path) as f:
+                f.write(data)
+            _dirty = False
+        except OSError:
+            pass
@@ -1,20 +1,26 @@
 """Template management for Numen."""
 
+import functools
 import os
 import pathlib
+import re
 import shutil
-import subprocess
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Set
 
 import frontmatter
-import yaml
 from rich.console import Console
 from rich.table import Table
 
 from numen.config import get_config
+from numen.utils import dumps_post, ensure_dir, load_post_cached, open_in_editor, read_frontmatter, slugify, write_text_atomic
 
 console = Console()
 
+# Directories already checked for default templates by this process
+_defaults_ensured: Set[str] = set()
+
+_TEMPLATE_VAR_RE = re.compile(r"\{\{(\w+)\}\}")
+
 DEFAULT_TEMPLATES = {
     "meeting": {
         "title": "Meeting Notes",
@@ -148,37 +154,50 @@ DEFAULT_TEMPLATES = {
 
 def get_templates_dir() -> pathlib.Path:
     """Get the path to the templates directory."""
-    config = get_config()
+    config = get_config(writable=False)
     templates_dir = pathlib.Path(os.path.expanduser(config.get("paths", {}).get("templates_dir", "~/.numen/templates")))
-    os.makedirs(templates_dir, exist_ok=True)
-    return templates_dir
+    return ensure_dir(templates_dir)
 
-def ensure_default_templates() -> None:
-    """Ensure that default templates exist in the templates directory."""
+@functools.lru_cache(maxsize=None)
+def _default_template_text(template_name: str) -> str:
+    """Serialize a default template once per process; DEFAULT_TEMPLATES never changes."""
+    template_data = DEFAULT_TEMPLATES[template_name]
+    metadata = {
+        "title": template_data["title"],
+        "description": template_data["description"],
+        "template": True,
+    }
+    
+    return dumps_post(frontmatter.Post(template_data["content"], **metadata))
+
+def ensure_default_templates() -> pathlib.Path:
+    """Ensure that default templates exist in the templates directory.
+    
+    The check runs once per directory per process. Returns the templates directory.
+    """
     templates_dir = get_templates_dir()
+    if str(templates_dir) in _defaults_ensured:
+        return templates_dir
+    
+    # One directory read instead of an existence check per default template
+    with os.scandir(templates_dir) as entries:
+        existing = {entry.name for entry in entries}
     
     for template_name, template_data in DEFAULT_TEMPLATES.items():
         template_file = templates_dir / f"{template_name}.md"
         
         # Only create if the template doesn't exist
-        if not template_file.exists():
-            metadata = {
-                "title": template_data["title"],
-                "description": template_data["description"],
-                "template": True,
-            }
-            
-            content = frontmatter.Post(template_data["content"], **metadata)
-            
-            with open(template_file, "w", encoding="utf-8") as f:
-                f.write(frontmatter.dumps(content))
+        if template_file.name not in existing:
+            template_file.write_text(_default_template_text(template_name), encoding="utf-8")
             
             console.print(f"[green]Created default template: {template_data['title']}[/green]")
+    
+    _defaults_ensured.add(str(templates_dir))
+    return templates_dir
 
 def list_templates() -> List[pathlib.Path]:
     """List all available templates."""
-    templates_dir = get_templates_dir()
-    ensure_default_templates()
+    templates_dir = ensure_default_templates()
     
     return list(templates_dir.glob("*.md"))
 
@@ -190,12 +209,12 @@ def display_templates(templates: List[pathlib.Path]) -> None:
     table.add_column("Description", style="yellow")
     
     for template_path in templates:
-        with open(template_path, "r", encoding="utf-8") as f:
-            post = frontmatter.load(f)
+        # Only the frontmatter is shown, so the template body is never read
+        metadata = read_frontmatter(template_path)
         
         name = template_path.stem
-        title = post.get("title", name)
-        description = post.get("description", "")
+        title = metadata.get("title", name)
+        description = metadata.get("description", "")
         
         table.add_row(name, title, description)
     
@@ -206,7 +225,7 @@ def create_template(name: str, title: str, description: str, content: str) -> pa
     templates_dir = get_templates_dir()
     
     # Sanitize the name
-    name = "".join(c if c.isalnum() or c in ['-', '_'] else '-' for c in name.lower().replace(" ", "-"))
+    name = slugify(name)
     template_path = templates_dir / f"{name}.md"
     
     metadata = {
@@ -217,13 +236,15 @@ def create_template(name: str, title: str, description: str, content: str) -> pa
     
     template = frontmatter.Post(content, **metadata)
     
-    with open(template_path, "w", encoding="utf-8") as f:
-        f.write(frontmatter.dumps(template))
+    template_path.write_text(dumps_post(template), encoding="utf-8")
     
     return template_path
 
-def edit_template(template_name: str) -> bool:
-    """Open a template in the configured editor."""
+def edit_template(template_name: str, replace_process: bool = False) -> bool:
+    """Open a template in the configured editor.
+    
+    With replace_process the editor replaces the current process; see open_in_editor.
+    """
     from numen.config import get_editor
     templates_dir = get_templates_dir()
     
@@ -235,8 +256,7 @@ def edit_template(template_name: str) -> bool:
             return False
     
     editor = get_editor()
-    subprocess.run([editor, str(template_path)], check=False)
-    return True
+    return open_in_editor(editor, template_path, replace_process)
 
 def delete_template(template_name: str, force: bool = False) -> bool:
     """Delete a template."""
@@ -272,8 +292,7 @@ def delete_template(template_name: str, force: bool = False) -> bool:
 
 def get_template_content(template_name: str) -> Optional[Dict]:
     """Get the content and metadata of a template."""
-    templates_dir = get_templates_dir()
-    ensure_default_templates()
+    templates_dir = ensure_default_templates()
     
     template_path = templates_dir / f"{template_name}.md"
     if not template_path.exists():
@@ -281,8 +300,7 @@ def get_template_content(template_name: str) -> Optional[Dict]:
         if not template_path.exists():
             return None
     
-    with open(template_path, "r", encoding="utf-8") as f:
-        post = frontmatter.load(f)
+    post = load_post_cached(template_path)
     
     return {
         "metadata": dict(post.metadata),
@@ -308,10 +326,8 @@ def apply_template(template_name: str, title: str) -> str:
         "datetime": now.strftime("%Y-%m-%d %H:%M"),
     }
     
-    for key, value in variables.items():
-        content = content.replace(f"{{{{{key}}}}}", value)
-    
-    return content
+    # One pass over the template; unknown {{names}} are left as they are
+    return _TEMPLATE_VAR_RE.sub(lambda match: variables.get(match.group(1), match.group(0)), content)
 
 def reset_template(template_name: str) -> bool:
     """Reset a template to its default state."""
@@ -323,16 +339,7 @@ def reset_template(template_name: str) -> bool:
     template_path = templates_dir / f"{template_name}.md"
     
     template_data = DEFAULT_TEMPLATES[template_name]
-    metadata = {
-        "title": template_data["title"],
-        "description": template_data["description"],
-        "template": True,
-    }
-    
-    content = frontmatter.Post(template_data["content"], **metadata)
-    
-    with open(template_path, "w", encoding="utf-8") as f:
-        f.write(frontmatter.dumps(content))
+    write_text_atomic(template_path, _default_template_text(template_name))
     
     console.print(f"[green]Reset template to default: {template_data['title']}[/green]")
     return True
@@ -1,19 +1,281 @@
 """Utility functions for Numen."""
 
+import contextlib
+import copy
+import functools
+import json
 import os
+import pathlib
 import re
-from typing import Dict, List, Optional, Set, Tuple
+import stat
+import sys
+from types import ModuleType
+from typing import IO, Any, Dict, Iterator, List, Optional, Set, Tuple, Union
 
+import frontmatter
+import yaml
 from rich.console import Console
-from rich.markdown import Markdown
 
 console = Console()
 
+# libyaml's C loader and dumper are many times faster than the pure-Python ones
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+YAML_DUMPER = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
 
-def display_markdown(text: str) -> None:
-    """Display text as Markdown in the terminal."""
+_FM_BOUNDARY_RE = re.compile(rb"^-{3,}[ \t]*\r?$", re.MULTILINE)
+_WORD_RE = re.compile(rb"\S+")
+_TEXT_WORD_RE = re.compile(r"\S+")
+_SECTION_HEADER_RE = re.compile(r"^#{1,6}\s+.*$", re.MULTILINE)
+_SECTION_BREAK_RE = re.compile(r"\n(?=#)")
+# \w is exactly str.isalnum() plus "_", so this matches every character a slug can't keep
+_SLUG_RE = re.compile(r"[^\w-]")
+_SENTENCE_BREAK_RE = re.compile(r"(?<=[.!?])\s+")
+
+
+@functools.cache
+def _orjson() -> Optional[ModuleType]:
+    """Return the orjson module, or None if it isn't installed; imported on first use."""
+    try:
+        import orjson
+    except ImportError:
+        return None
+    return orjson
+
+
+# orjson is optional; it (de)serializes large documents several times faster than json
+def json_dumps(obj: Any) -> bytes:
+    """Serialize obj to compact UTF-8 JSON."""
+    orjson = _orjson()
+    if orjson is not None:
+        data: bytes = orjson.dumps(obj)
+        return data
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+def json_loads(data: Union[str, bytes]) -> Any:
+    """Parse JSON text or UTF-8 bytes."""
+    orjson = _orjson()
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+# Notes longer than this (in characters) are shown through a pager when paging is asked for
+PAGER_THRESHOLD = 8 * 1024
+
+
+def display_markdown(text: str, page: bool = False) -> None:
+    """Display text as Markdown in the terminal.
+    
+    With page set, long text on a terminal is shown through the pager a
+    screen at a time instead of scrolling past at once.
+    """
+    from rich.markdown import Markdown
+    
     md = Markdown(text)
-    console.print(md)
+    if page and console.is_terminal and len(text) > PAGER_THRESHOLD:
+        with console.pager(styles=True):
+            console.print(md)
+    else:
+        console.print(md)
+
+
+def parse_frontmatter(data: bytes) -> Tuple[Dict, int]:
+    """Parse the frontmatter of raw note bytes and return (metadata, body offset).
+    
+    Only the YAML block between the leading --- lines is parsed. Files
+    without frontmatter yield empty metadata and offset 0.
+    """
+    first_line_end = data.find(b"\n")
+    if first_line_end == -1 or not _FM_BOUNDARY_RE.match(data, 0, first_line_end):
+        return {}, 0
+    
+    closing = _FM_BOUNDARY_RE.search(data, first_line_end + 1)
+    if closing is None:
+        return {}, 0
+    
+    metadata = yaml.load(data[first_line_end + 1:closing.start()], Loader=YAML_LOADER)
+    if not isinstance(metadata, dict):
+        metadata = {}
+    return metadata, closing.end()
+
+
+def read_frontmatter(path: Union[str, os.PathLike]) -> Dict:
+    """Parse only the frontmatter of the note at path.
+    
+    Reads line by line and stops at the closing ---, so the body is never
+    read. Returns empty metadata when the note has no frontmatter.
+    """
+    with open(path, "rb") as f:
+        first = f.readline()
+        if not _FM_BOUNDARY_RE.match(first.rstrip(b"\n")):
+            return {}
+        lines = [first]
+        for line in f:
+            lines.append(line)
+            if _FM_BOUNDARY_RE.match(line.rstrip(b"\n")):
+                return parse_frontmatter(b"".join(lines))[0]
+    return {}
+
+
+class FastYAMLHandler(frontmatter.YAMLHandler):
+    """YAML frontmatter handler that parses and dumps with libyaml when it is available."""
+    
+    def load(self, fm: str, **kwargs: object) -> Any:
+        kwargs.setdefault("Loader", YAML_LOADER)
+        return super().load(fm, **kwargs)
+    
+    def export(self, metadata: Dict[str, object], **kwargs: object) -> str:
+        kwargs.setdefault("Dumper", YAML_DUMPER)
+        return str(super().export(metadata, **kwargs))
+
+
+YAML_HANDLER = FastYAMLHandler()
+
+
+def loads_post(text: str) -> frontmatter.Post:
+    """Parse note text like frontmatter.loads, using the fast YAML handler."""
+    # Only force the handler for YAML frontmatter; TOML/JSON still auto-detect
+    handler = YAML_HANDLER if YAML_HANDLER.detect(text) else None
+    return frontmatter.loads(text, handler=handler)
+
+
+def load_post(fd: Union[str, os.PathLike, IO[str]]) -> frontmatter.Post:
+    """Load a note from a path or an open text file, using the fast YAML handler."""
+    if hasattr(fd, "read"):
+        return loads_post(fd.read())
+    with open(fd, "r", encoding="utf-8") as f:
+        return loads_post(f.read())
+
+
+@functools.lru_cache(maxsize=256)
+def _parse_post_file(path: str, mtime_ns: int, size: int) -> Tuple[Dict[str, Any], str, Any]:
+    """Parse a note file; keyed by mtime and size so an edited file is parsed again."""
+    post = load_post(path)
+    return post.metadata, post.content, post.handler
+
+
+def load_post_cached(path: Union[str, os.PathLike]) -> frontmatter.Post:
+    """Load a note like load_post, reusing the parse for as long as the file is unchanged.
+    
+    Every call gets its own Post with a copy of the metadata, so callers may modify it.
+    """
+    stat = os.stat(path)
+    metadata, content, handler = _parse_post_file(os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    post = frontmatter.Post(content, handler)
+    post.metadata.update(copy.deepcopy(metadata))
+    return post
+
+
+def dumps_post(post: frontmatter.Post) -> str:
+    """Serialize a note like frontmatter.dumps, using the fast YAML handler for new posts."""
+    return str(frontmatter.dumps(post, handler=getattr(post, "handler", None) or YAML_HANDLER))
+
+
+# Directories already created by this process, so each is created only once
+_dirs_ensured: Set[str] = set()
+
+
+def ensure_dir(path: Union[str, os.PathLike]) -> pathlib.Path:
+    """Create path and its parents unless this process already did, and return it as a Path."""
+    key = os.fspath(path)
+    if key not in _dirs_ensured:
+        os.makedirs(key, exist_ok=True)
+        _dirs_ensured.add(key)
+    return pathlib.Path(path)
+
+
+def forget_dir(path: Union[str, os.PathLike]) -> None:
+    """Let ensure_dir create path again, after it was removed."""
+    _dirs_ensured.discard(os.fspath(path))
+
+
+@functools.cache
+def _new_file_mode() -> int:
+    """Return the permissions a newly created file gets under this process's umask."""
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+@contextlib.contextmanager
+def open_atomic(path: Union[str, os.PathLike], mode: str = "wb", encoding: Optional[str] = None, fsync: bool = False) -> Iterator[IO[Any]]:
+    """Open a temporary file that replaces path when the block completes, so a crash never leaves half of it.
+    
+    The temporary file sits next to path. It keeps an existing file's permissions
+    and otherwise gets those of a new file. Pass fsync to flush it to disk first.
+    If the block raises, path is left untouched.
+    """
+    import tempfile
+    
+    path = os.fspath(path)
+    directory, name = os.path.split(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory or ".", prefix=f".{name}.", suffix=".tmp")
+    try:
+        try:
+            file_mode = stat.S_IMODE(os.stat(path).st_mode)
+        except FileNotFoundError:
+            file_mode = _new_file_mode()
+        # mkstemp creates the file readable by its owner only
+        os.chmod(tmp_path, file_mode)
+        with os.fdopen(fd, mode, encoding=encoding) as f:
+            yield f
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def write_text_atomic(path: Union[str, os.PathLike], text: str, fsync: bool = False) -> None:
+    """Replace the file at path with text in one write; see open_atomic."""
+    with open_atomic(path, "w", encoding="utf-8", fsync=fsync) as f:
+        f.write(text)
+
+
+def open_in_editor(editor: str, path: Union[str, os.PathLike], replace_process: bool = False) -> bool:
+    """Open path in editor and wait for it to exit.
+    
+    With replace_process the editor takes the place of this process via
+    os.execvp, which saves a fork and Python's shutdown when the command has
+    nothing left to do. Exit handlers never run then, so callers must save
+    anything they still hold first.
+    
+    Returns False, after printing the error, if the editor can't be started.
+    """
+    import subprocess
+    
+    args = [editor, os.fspath(path)]
+    try:
+        if replace_process and os.name == "posix":
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os.execvp(editor, args)
+        subprocess.run(args, check=False)
+    except OSError as e:
+        console.print(f"[red]Error opening editor: {e}[/red]")
+        return False
+    return True
+
+
+def slugify(text: str) -> str:
+    """Lowercase text and replace every character but letters, digits, '-' and '_' with '-'."""
+    return _SLUG_RE.sub("-", text.lower())
+
+
+def count_words(data: Union[str, bytes], start: int = 0) -> int:
+    """Count whitespace-separated words in text or raw bytes without building a list.
+    
+    Counting begins at offset start, so a note's body can be counted in place.
+    """
+    if isinstance(data, str):
+        return sum(1 for _ in _TEXT_WORD_RE.finditer(data, start))
+    return sum(1 for _ in _WORD_RE.finditer(data, start))
 
 
 def extract_sections(content: str) -> List[Tuple[str, str]]:
@@ -24,28 +286,34 @@ def extract_sections(content: str) -> List[Tuple[str, str]]:
     if not content.strip():
         return [("", "")]
     
-    pattern = r"(^#{1,6}\s+.*$)"
-    parts = re.split(pattern, content, flags=re.MULTILINE)
-    
     sections = []
     current_header = ""
-    current_content = ""
-    
-    for i, part in enumerate(parts):
-        if re.match(pattern, part, re.MULTILINE):
-            if i > 0:
-                sections.append((current_header, current_content.strip()))
-            current_header = part
-            current_content = ""
-        else:
-            current_content += part
+    start = 0
+    
+    # Slice the text between header matches instead of splitting and rejoining it
+    for match in _SECTION_HEADER_RE.finditer(content):
+        sections.append((current_header, content[start:match.start()].strip()))
+        current_header = match.group(0)
+        start = match.end()
     
-    if current_header or current_content:
-        sections.append((current_header, current_content.strip()))
+    if current_header or start < len(content):
+        sections.append((current_header, content[start:].strip()))
     
-    if not sections:
-        sections = [("", content.strip())]
+    return sections
+
+
+def split_sections(content: str) -> List[str]:
+    """Split note content into sections, each starting at a line that begins with '#'.
     
+    The newline before each such line is dropped, so "\n".join(sections)
+    gives back the original content exactly.
+    """
+    sections = []
+    start = 0
+    for match in _SECTION_BREAK_RE.finditer(content):
+        sections.append(content[start:match.start()])
+        start = match.end()
+    sections.append(content[start:])
     return sections
 
 
@@ -55,7 +323,7 @@ def count_tokens(text: str) -> int:
     This is a very basic approximation. For more accuracy,
     you should use the tokenizer specific to your model.
     """
-    return len(text) // 4
+    return len(text) >> 2
 
 
 def chunk_text(text: str, max_tokens: int = 4000) -> List[str]:
@@ -67,36 +335,37 @@ def chunk_text(text: str, max_tokens: int = 4000) -> List[str]:
     
     paragraphs = text.split("\n\n")
     chunks = []
-    current_chunk = ""
+    # Pieces of the chunk being built, joined once when it is flushed
+    current_parts: List[str] = []
     current_tokens = 0
     
     for paragraph in paragraphs:
-        paragraph_tokens = count_tokens(paragraph)
+        # count_tokens inlined: this loop runs once per paragraph and sentence
+        paragraph_tokens = len(paragraph) >> 2
         
         if paragraph_tokens > max_tokens:
-            sentences = re.split(r'(?<=[.!?])\s+', paragraph)
-            for sentence in sentences:
-                sentence_tokens = count_tokens(sentence)
+            for sentence in _SENTENCE_BREAK_RE.split(paragraph):
+                sentence_tokens = len(sentence) >> 2
                 
                 if current_tokens + sentence_tokens <= max_tokens:
-                    current_chunk += sentence + " "
+                    current_parts += (sentence, " ")
                     current_tokens += sentence_tokens
                 else:
-                    if current_chunk:
-                        chunks.append(current_chunk.strip())
-                    current_chunk = sentence + " "
+                    if current_parts:
+                        chunks.append("".join(current_parts).strip())
+                    current_parts = [sentence, " "]
                     current_tokens = sentence_tokens
         else:
             if current_tokens + paragraph_tokens <= max_tokens:
-                current_chunk += paragraph + "\n\n"
+                current_parts += (paragraph, "\n\n")
                 current_tokens += paragraph_tokens
             else:
-                chunks.append(current_chunk.strip())
-                current_chunk = paragraph + "\n\n"
+                chunks.append("".join(current_parts).strip())
+                current_parts = [paragraph, "\n\n"]
                 current_tokens = paragraph_tokens
     
-    if current_chunk:
-        chunks.append(current_chunk.strip())
+    if current_parts:
+        chunks.append("".join(current_parts).strip())
     
     return chunks
 
@@ -119,48 +388,56 @@ def optimize_large_content(content: str, max_size: int = 100000) -> str:
         
     console.print(f"[yellow]Note is very large ({len(content):,} chars). Optimizing for AI processing...[/yellow]")
     
+    optimized = trim_content(content, max_size)
+    console.print(f"[green]Successfully optimized content from {len(content):,} to {len(optimized):,} chars[/green]")
+    
+    return optimized
+
+
+def trim_content(content: str, max_size: int) -> str:
+    """Trim content to about max_size characters, keeping the first and last sections.
+    
+    This is the silent core of optimize_large_content.
+    """
+    if len(content) <= max_size:
+        return content
+    
     sections = extract_sections(content)
     
     if len(sections) <= 1:
         first_part = content[:max_size // 2]
-        last_part = content[-(max_size // 2):]
+        last_part = content[-(max_size // 2):] if max_size >= 2 else ""
         return f"{first_part}\n\n[...content trimmed for size...]\n\n{last_part}"
         
     first_section = sections[0]
     last_section = sections[-1]
     
-    first_size = len(first_section[0]) + len(first_section[1])
-    last_size = len(last_section[0]) + len(last_section[1])
-    middle_budget = max_size - first_size - last_size - 50
+    sizes = [len(header) + len(body) for header, body in sections]
+    middle_budget = max_size - sizes[0] - sizes[-1] - 50
     
     middle_sections = []
     current_size = 0
     
-    sorted_middle_sections = sorted(
-        sections[1:-1],
-        key=lambda s: len(s[1])
-    )
+    # When the first and last sections alone use up the budget, nothing else fits
+    if middle_budget >= 0:
+        # Shortest bodies first; indexes keep the sort from copying the sections
+        order = sorted(range(1, len(sections) - 1), key=lambda i: len(sections[i][1]))
+        for i in order:
+            if current_size + sizes[i] <= middle_budget:
+                middle_sections.append(sections[i])
+                current_size += sizes[i]
+            else:
+                break
     
-    for header, content in sorted_middle_sections:
-        section_size = len(header) + len(content)
-        if current_size + section_size <= middle_budget:
-            middle_sections.append((header, content))
-            current_size += section_size
-        else:
-            break
-            
     result = []
     result.append(first_section[0] + first_section[1])
     
     if middle_sections:
-        for header, content in middle_sections:
-            result.append(header + content)
+        for header, body in middle_sections:
+            result.append(header + body)
     else:
         result.append("\n[...content trimmed for size...]\n")
         
     result.append(last_section[0] + last_section[1])
     
-    optimized = "\n\n".join(result)
-    console.print(f"[green]Successfully optimized content from {len(content):,} to {len(optimized):,} chars[/green]")
-    
-    return optimized
+    return "\n\n".join(result)
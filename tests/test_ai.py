@@ -0,0 +1,430 @@
+"""Tests for the AI module."""
+
+import asyncio
+import pathlib
+import tempfile
+from unittest import mock
+
+import pytest
+
+from numen.ai import (
+    AIProvider,
+    OllamaProvider,
+    OpenAIProvider,
+    StreamError,
+    get_ai_provider,
+    process_text_fastest,
+    process_text_stream,
+    process_texts,
+    reset_ai_provider,
+)
+from numen.ai.batch import process_texts_bulk
+from numen.ai.cache import DiskCache, make_key
+from numen.ai.retry import MAX_ATTEMPTS, aretry_call, backoff, retry_call
+from numen.ai.semantic_cache import SemanticCache
+from numen.ai.tokens import context_window, trim_to_tokens
+
+
+class EchoProvider(AIProvider):
+    """Provider that answers with the prompt it was given."""
+
+    def _generate_text(self, prompt: str, max_tokens: int = 1024) -> str:
+        return prompt
+
+    async def _agenerate_text(self, prompt: str, max_tokens: int = 1024) -> str:
+        # Later texts finish first to make sure ordering is preserved
+        await asyncio.sleep(0.01 / (len(prompt) or 1))
+        return prompt
+
+
+@pytest.fixture
+def echo_provider():
+    """Patch the configured provider with an EchoProvider."""
+    with mock.patch("numen.ai.get_ai_config", return_value={"temperature": 0.7}):
+        provider = EchoProvider()
+    with mock.patch("numen.ai.get_ai_provider", return_value=provider):
+        yield provider
+
+
+def test_process_texts_preserves_order(echo_provider):
+    """Test that process_texts returns results in the order of the inputs."""
+    texts = ["first note", "second", "3"]
+
+    results = process_texts("summarize", texts)
+
+    assert len(results) == len(texts)
+    for text, result in zip(texts, results):
+        assert text in result
+
+
+def test_process_texts_reports_exceptions(echo_provider):
+    """Test that one failing request does not abort the whole batch."""
+
+    async def failing(prompt: str, max_tokens: int) -> str:
+        if "boom" in prompt:
+            raise RuntimeError("boom")
+        return prompt
+
+    with mock.patch.object(echo_provider, "_agenerate_text", side_effect=failing):
+        results = process_texts("expand", ["fine", "boom"])
+
+    assert "fine" in results[0]
+    assert results[1].startswith("Error processing text:")
+
+
+def test_process_texts_unknown_action(echo_provider):
+    """Test that an unknown action is reported for every input."""
+    assert process_texts("translate", ["a", "b"]) == ["Unknown action: translate"] * 2
+
+
+def test_actions_use_their_max_tokens(echo_provider):
+    """Test that each action passes its own output budget to the provider."""
+    echo_provider.action_max_tokens["summarize"] = 128
+
+    with mock.patch.object(
+        echo_provider, "_generate_text", return_value="ok"
+    ) as generate:
+        echo_provider.summarize("text")
+        echo_provider.generate_text("custom prompt")
+
+    assert generate.call_args_list[0].args[1] == 128
+    assert generate.call_args_list[1].args[1] == 1024
+
+
+def test_prompt_keeps_braces_in_notes(echo_provider):
+    """Test that note text containing braces is passed through verbatim."""
+    note = '{"key": "{value}"} and {selected_text}'
+
+    assert note in echo_provider.expand(note)
+
+
+def test_get_ai_provider_is_shared_until_config_changes():
+    """Test that one provider is reused and replaced only when settings change."""
+    config = {"default_provider": "ollama", "temperature": 0.7}
+    reset_ai_provider()
+
+    with (
+        mock.patch("numen.ai.get_ai_config", side_effect=lambda: dict(config)),
+        mock.patch(
+            "numen.ai._build_provider", side_effect=lambda name: mock.Mock()
+        ) as build,
+    ):
+        first = get_ai_provider()
+        assert get_ai_provider() is first
+
+        config["temperature"] = 0.2
+        second = get_ai_provider()
+
+    assert second is not first
+    assert build.call_count == 2
+    first.close.assert_called_once()
+    reset_ai_provider()
+
+
+def test_process_text_fastest_skips_fast_errors():
+    """Test that the first successful provider wins over a faster failure."""
+
+    class FailingProvider(EchoProvider):
+        async def _agenerate_text(self, prompt: str, max_tokens: int = 1024) -> str:
+            return "Error: connection refused"
+
+    class SlowProvider(EchoProvider):
+        async def _agenerate_text(self, prompt: str, max_tokens: int = 1024) -> str:
+            await asyncio.sleep(0.05)
+            return "slow"
+
+    with mock.patch("numen.ai.get_ai_config", return_value={"temperature": 0.7}):
+        providers = [FailingProvider(), SlowProvider(), EchoProvider()]
+
+    with mock.patch("numen.ai._enabled_providers", return_value=providers):
+        result = process_text_fastest("summarize", "some text")
+
+    assert "some text" in result
+
+
+def test_process_text_stream_yields_chunks(echo_provider):
+    """Test that streamed output joins to the same text as the buffered call."""
+    chunks = list(process_text_stream("poetic", "a quiet morning"))
+
+    assert chunks
+    assert "".join(chunks) == echo_provider.poetic("a quiet morning")
+
+
+def test_generate_text_stream_fills_cache(mock_cache_dir):
+    """Test that a streamed response is cached and replayed in one piece."""
+    with mock.patch("numen.ai.get_ai_config", return_value={"temperature": 0}):
+        provider = EchoProvider()
+
+    with mock.patch.object(
+        provider, "_generate_text_stream", return_value=iter(["an", "swer"])
+    ) as stream:
+        assert list(provider.generate_text_stream("prompt")) == ["an", "swer"]
+        assert list(provider.generate_text_stream("prompt")) == ["answer"]
+
+    assert stream.call_count == 1
+
+
+def test_interrupted_stream_is_not_cached(mock_cache_dir):
+    """Test that a stream ending in an error is neither cached nor replayed."""
+    with mock.patch(
+        "numen.ai.get_ai_config",
+        return_value={"temperature": 0, "semantic_cache": True},
+    ):
+        provider = EchoProvider()
+    chunks = ["partial answer ", StreamError("Error: connection reset")]
+
+    with (
+        mock.patch.object(
+            provider, "_generate_text_stream", side_effect=lambda *args: iter(chunks)
+        ) as stream,
+        mock.patch(
+            "numen.ai.semantic_cache.SemanticCache.embed", return_value=[1.0, 0.0]
+        ),
+    ):
+        assert (
+            "".join(provider.stream("summarize", "note"))
+            == "partial answer Error: connection reset"
+        )
+        assert (
+            "".join(provider.stream("summarize", "note"))
+            == "partial answer Error: connection reset"
+        )
+
+    assert stream.call_count == 2
+
+
+@pytest.fixture
+def mock_cache_dir():
+    """Point the response cache at a temporary directory."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        with (
+            mock.patch(
+                "numen.ai.cache.get_cache_dir", return_value=pathlib.Path(temp_dir)
+            ),
+            mock.patch(
+                "numen.ai.semantic_cache.get_cache_dir",
+                return_value=pathlib.Path(temp_dir),
+            ),
+        ):
+            yield temp_dir
+
+
+def test_make_key_depends_on_every_parameter():
+    """Test that changing any request parameter changes the cache key."""
+    base = make_key("OpenAIProvider", "gpt-4", 0.0, "prompt", system="sys")
+
+    assert base == make_key("OpenAIProvider", "gpt-4", 0.0, "prompt", system="sys")
+    assert base != make_key("AnthropicProvider", "gpt-4", 0.0, "prompt", system="sys")
+    assert base != make_key("OpenAIProvider", "gpt-3.5", 0.0, "prompt", system="sys")
+    assert base != make_key("OpenAIProvider", "gpt-4", 0.5, "prompt", system="sys")
+    assert base != make_key("OpenAIProvider", "gpt-4", 0.0, "other", system="sys")
+    assert base != make_key("OpenAIProvider", "gpt-4", 0.0, "prompt", system="other")
+
+
+def test_disk_cache_expires_entries(mock_cache_dir):
+    """Test that DiskCache returns stored values until their TTL elapses."""
+    cache = DiskCache()
+    cache.set("fresh", "value", ttl=60)
+    cache.set("stale", "value", ttl=1)
+
+    with mock.patch("numen.ai.cache.time.time", return_value=10**12):
+        assert cache.get("stale") is None
+    assert cache.get("fresh") == "value"
+    assert cache.get("missing") is None
+
+
+def test_generate_text_uses_cache(mock_cache_dir):
+    """Test that deterministic requests are only sent to the provider once."""
+    with mock.patch("numen.ai.get_ai_config", return_value={"temperature": 0}):
+        provider = EchoProvider()
+
+    with mock.patch.object(
+        provider, "_generate_text", return_value="answer"
+    ) as generate:
+        assert provider.generate_text("prompt") == "answer"
+        assert provider.generate_text("prompt") == "answer"
+
+    assert generate.call_count == 1
+
+
+def test_generate_text_does_not_cache_errors(mock_cache_dir):
+    """Test that error responses are retried instead of cached."""
+    with mock.patch("numen.ai.get_ai_config", return_value={"temperature": 0}):
+        provider = EchoProvider()
+
+    with mock.patch.object(
+        provider, "_generate_text", return_value="Error: HTTP 500"
+    ) as generate:
+        provider.generate_text("prompt")
+        provider.generate_text("prompt")
+
+    assert generate.call_count == 2
+
+
+def test_semantic_cache_matches_similar_prompts(mock_cache_dir):
+    """Test that SemanticCache reuses responses only above the similarity threshold."""
+    vectors = {
+        "original": [1.0, 0.0, 0.0],
+        "rephrased": [0.99, 0.1, 0.0],
+        "unrelated": [0.0, 0.0, 1.0],
+    }
+    cache = SemanticCache("test", threshold=0.92)
+
+    with mock.patch.object(cache, "embed", side_effect=lambda text: vectors[text]):
+        cache.set("original", "cached answer")
+
+        assert cache.get("rephrased") == "cached answer"
+        assert cache.get("unrelated") is None
+
+
+def test_retry_call_retries_transient_errors():
+    """Test that retry_call retries only the given exception types."""
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise TimeoutError("busy")
+        return "ok"
+
+    with mock.patch("numen.ai.retry.time.sleep") as sleep:
+        assert retry_call(flaky, (TimeoutError,)) == "ok"
+        assert sleep.call_count == 2
+
+        with pytest.raises(ValueError):
+            retry_call(mock.Mock(side_effect=ValueError("bad")), (TimeoutError,))
+        assert sleep.call_count == 2
+
+
+def test_retry_call_gives_up_after_max_attempts():
+    """Test that retry_call re-raises the last error once every attempt has failed."""
+    func = mock.Mock(side_effect=TimeoutError("busy"))
+
+    with mock.patch("numen.ai.retry.time.sleep") as sleep:
+        with pytest.raises(TimeoutError):
+            retry_call(func, (TimeoutError,), "prompt", max_tokens=10)
+
+    assert func.call_count == MAX_ATTEMPTS
+    func.assert_called_with("prompt", max_tokens=10)
+    assert sleep.call_count == MAX_ATTEMPTS - 1
+
+
+def test_retry_call_passes_other_errors_through():
+    """Test that errors outside retry_on are raised on the first call without waiting."""
+    error = ValueError("bad request")
+    func = mock.Mock(side_effect=error)
+
+    with mock.patch("numen.ai.retry.time.sleep") as sleep:
+        with pytest.raises(ValueError) as raised:
+            retry_call(func, (TimeoutError, ConnectionError))
+
+    assert raised.value is error
+    func.assert_called_once()
+    sleep.assert_not_called()
+
+
+def test_aretry_call_retries_and_gives_up():
+    """Test that aretry_call retries transient errors and re-raises once attempts run out."""
+    flaky = mock.AsyncMock(side_effect=[ConnectionError("reset"), "ok"])
+    failing = mock.AsyncMock(side_effect=ConnectionError("reset"))
+    wrong = mock.AsyncMock(side_effect=KeyError("model"))
+
+    with mock.patch(
+        "numen.ai.retry.asyncio.sleep", new_callable=mock.AsyncMock
+    ) as sleep:
+        assert asyncio.run(aretry_call(flaky, (ConnectionError,), "prompt")) == "ok"
+        assert sleep.await_count == 1
+
+        with pytest.raises(ConnectionError):
+            asyncio.run(aretry_call(failing, (ConnectionError,), attempts=3))
+        assert failing.await_count == 3
+        assert sleep.await_count == 3
+
+        with pytest.raises(KeyError):
+            asyncio.run(aretry_call(wrong, (ConnectionError,)))
+        wrong.assert_awaited_once()
+        assert sleep.await_count == 3
+
+
+def test_backoff_grows_with_jitter_up_to_the_cap():
+    """Test that waits double per attempt, add at most one initial wait of jitter, and are capped."""
+    for attempt in range(4):
+        wait = backoff(attempt, initial=1.0, maximum=100.0)
+        assert 2.0**attempt <= wait <= 2.0**attempt + 1.0
+
+    assert backoff(10, initial=1.0, maximum=30.0) == 30.0
+
+
+def test_trim_to_tokens_fits_budget():
+    """Test that long text is trimmed to the budget while short text is untouched."""
+
+    def counter(text):
+        return len(text) // 4
+
+    sections = "\n\n".join(f"## Section {i}\n\n" + "word " * 200 for i in range(20))
+
+    assert trim_to_tokens("short", 100, counter) == "short"
+    trimmed = trim_to_tokens(sections, 1000, counter)
+    assert counter(trimmed) <= 1000
+    assert trimmed.lstrip().startswith("## Section 0")
+    assert counter(trim_to_tokens("x" * 50000, 500, counter)) <= 500
+
+
+def test_context_window_matches_longest_prefix():
+    """Test that model names resolve to the most specific context window."""
+    assert context_window("gpt-4-turbo-2024-04-09") == 128000
+    assert context_window("gpt-4") == 8192
+    assert context_window("unknown-model") == 8192
+
+
+def test_ollama_sends_encoded_json():
+    """Test that OllamaProvider posts a pre-encoded body and parses raw bytes."""
+    with mock.patch(
+        "numen.ai.get_ai_config",
+        return_value={"temperature": 0.7, "cache_enabled": False},
+    ):
+        provider = OllamaProvider()
+    provider._client = mock.Mock()
+    provider._client.post.return_value = mock.Mock(
+        status_code=200, content=b'{"response": "hi", "done": true}'
+    )
+
+    assert provider.generate_text("prompt") == "hi"
+
+    _, kwargs = provider._client.post.call_args
+    body = kwargs.get("content", kwargs.get("data"))
+    assert isinstance(body, bytes)
+    assert b'"prompt":' in body
+
+
+def test_process_texts_bulk_orders_openai_batch_results():
+    """Test that batch output lines are mapped back to the order of the inputs."""
+    provider = mock.Mock(spec=OpenAIProvider)
+    provider.prepare_request.side_effect = lambda action, text: (text, 256)
+    provider.cached_response.return_value = None
+    provider.request_args.side_effect = lambda prompt, max_tokens: {
+        "messages": [prompt],
+        "max_tokens": max_tokens,
+    }
+    client = provider.client = mock.Mock()
+    client.batches.create.return_value = mock.Mock(id="batch", status="in_progress")
+    client.batches.retrieve.return_value = mock.Mock(
+        id="batch", status="completed", output_file_id="out"
+    )
+    client.files.content.return_value = mock.Mock(
+        text="\n".join(
+            [
+                '{"custom_id": "1", "response": {"status_code": 200, "body": {"choices": [{"message": {"content": "second"}}]}}}',
+                '{"custom_id": "0", "response": {"status_code": 200, "body": {"choices": [{"message": {"content": "first"}}]}}}',
+            ]
+        )
+    )
+
+    with (
+        mock.patch("numen.ai.batch.get_ai_provider", return_value=provider),
+        mock.patch("numen.ai.batch.time.sleep"),
+    ):
+        results = process_texts_bulk("summarize", ["a", "b", "c"], poll_interval=0)
+
+    assert results[:2] == ["first", "second"]
+    assert results[2].startswith("Error")
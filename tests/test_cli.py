@@ -0,0 +1,61 @@
+"""Tests for the command-line interface."""
+
+import pathlib
+import tempfile
+import zipfile
+from unittest import mock
+
+import pytest
+from typer.testing import CliRunner
+
+from numen.cli import app
+
+
+@pytest.fixture
+def notes_dir():
+    """Point the CLI at a notes directory that doesn't exist yet, with config kept in a temporary directory."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        config_dir = pathlib.Path(temp_dir) / "config"
+        notes_dir = pathlib.Path(temp_dir) / "custom" / "notes"
+        with (
+            mock.patch("numen.config.CONFIG_DIR", str(config_dir)),
+            mock.patch("numen.config.CONFIG_FILE", str(config_dir / "config.toml")),
+            mock.patch("numen.cli.get_notes_dir", return_value=notes_dir),
+        ):
+            yield notes_dir
+
+
+def make_backup(path, notes):
+    """Write a backup zip holding notes, a dict of archive names to text."""
+    with zipfile.ZipFile(path, "w") as zipf:
+        for name, text in notes.items():
+            zipf.writestr(name, text)
+    return str(path)
+
+
+def test_import_creates_a_missing_notes_directory(notes_dir):
+    """Test that importing into a notes directory that doesn't exist yet creates it."""
+    backup = make_backup(
+        notes_dir.parent.parent / "backup.zip",
+        {"first.md": "First.", "second.md": "Second."},
+    )
+
+    result = CliRunner().invoke(app, ["import", backup])
+
+    assert "Successfully imported 2 notes." in result.output
+    assert (notes_dir / "first.md").read_text(encoding="utf-8") == "First."
+    assert (notes_dir / "second.md").read_text(encoding="utf-8") == "Second."
+
+
+def test_import_keeps_the_first_of_notes_sharing_a_name(notes_dir):
+    """Test that archive entries with the same base name don't overwrite each other."""
+    backup = make_backup(
+        notes_dir.parent.parent / "backup.zip",
+        {"a/note.md": "From a.", "b/note.md": "From b."},
+    )
+
+    result = CliRunner().invoke(app, ["import", backup])
+
+    assert "Skipping b/note.md" in result.output
+    assert "Successfully imported 1 notes." in result.output
+    assert (notes_dir / "note.md").read_text(encoding="utf-8") == "From a."
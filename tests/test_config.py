@@ -11,9 +11,13 @@ import toml
 from numen.config import (
     DEFAULT_CONFIG,
     ensure_config_exists,
+    get_ai_config,
     get_config,
     get_editor,
     get_notes_dir,
+    invalidate_ai_config,
+    invalidate_config,
+    save_config,
 )
 
 
@@ -99,4 +103,40 @@ def test_get_notes_dir():
     with mock.patch("numen.config.get_config", return_value=mock_config):
         notes_dir = get_notes_dir()
         assert isinstance(notes_dir, pathlib.Path)
-        assert str(notes_dir).endswith("test_notes") 
\ No newline at end of file
+        assert str(notes_dir).endswith("test_notes") 
+
+
+def test_get_ai_config_is_memoized(mock_config_dir):
+    """Test that get_ai_config reuses its result until it is invalidated."""
+    invalidate_ai_config()
+    ensure_config_exists()
+    
+    with mock.patch("numen.config.get_config", wraps=get_config) as wrapped:
+        get_ai_config()
+        get_ai_config()
+        assert wrapped.call_count == 1
+    
+    config = get_config()
+    config["ai"]["default_provider"] = "test_provider"
+    save_config(config)
+    
+    assert get_ai_config()["default_provider"] == "test_provider"
+    invalidate_ai_config()
+
+
+def test_get_config_parses_file_only_when_changed(mock_config_dir):
+    """Test that get_config reuses the parsed file until it changes, and hands out copies."""
+    invalidate_config()
+    ensure_config_exists()
+    get_config()["ai"]["default_provider"] = "mutated"
+    
+    with mock.patch("numen.config.toml.load", wraps=toml.load) as load:
+        assert get_config() == DEFAULT_CONFIG
+        assert load.call_count == 0
+        
+        config = get_config()
+        config["editor"]["default"] = "test_editor"
+        save_config(config)
+        assert get_config()["editor"]["default"] == "test_editor"
+        assert load.call_count == 1
+    invalidate_config()
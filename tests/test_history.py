@@ -0,0 +1,293 @@
+"""Tests for the history module."""
+
+import datetime
+import difflib
+import json
+import pathlib
+import shutil
+import tempfile
+from unittest import mock
+
+import pytest
+
+from numen import history
+
+
+@pytest.fixture
+def note_path():
+    """Provide a note and an empty history directory for it."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        history_dir = pathlib.Path(temp_dir) / "history"
+        history_dir.mkdir()
+        note_path = pathlib.Path(temp_dir) / "review.md"
+        note_path.write_text("First draft.", encoding="utf-8")
+        with mock.patch("numen.history.get_history_dir", return_value=history_dir):
+            yield note_path
+
+
+def save_at(note_path, when, message):
+    """Save a version of note_path as if it were the time given."""
+    fake = mock.Mock(wraps=datetime)
+    fake.datetime.now.return_value = when
+    with mock.patch("numen.history.datetime", fake):
+        return history.save_version(note_path, message)
+
+
+def saved_ids(note_path):
+    """Return the version IDs of note_path, oldest first."""
+    return [v["version_id"] for v in reversed(history.list_versions(note_path))]
+
+
+def test_versions_are_logged_in_one_file(note_path):
+    """Test that saves append to the history log, which lists newest first and skips removed versions."""
+    first = save_at(note_path, datetime.datetime(2024, 3, 1, 9, 30), "first")
+    note_path.write_text("Second draft.", encoding="utf-8")
+    second = save_at(note_path, datetime.datetime(2024, 3, 2, 9, 30), "second")
+    history_dir = history.get_history_dir() / note_path.stem
+
+    assert sorted(path.name for path in history_dir.iterdir()) == [
+        f"{first}.md",
+        f"{second}.md",
+        history.LOG_FILE,
+    ]
+    assert [v["message"] for v in history.list_versions(note_path)] == [
+        "second",
+        "first",
+    ]
+    assert saved_ids(note_path) == [first, second]
+    assert [history.resolve_version_id(note_path, ref) for ref in (0, 1, -1, 2)] == [
+        first,
+        second,
+        second,
+        None,
+    ]
+
+    diff = history.compare_versions(note_path.stem, 0, 1)
+    assert diff[-2:] == ["-First draft.", "+Second draft."]
+    with mock.patch("difflib.unified_diff") as unified_diff:
+        assert history.compare_versions(note_path.stem, first, second) == diff
+        assert history.compare_versions(note_path.stem, second, -1) == []
+    unified_diff.assert_not_called()
+
+    (history_dir / f"{second}.md").unlink()
+    assert [v["version_id"] for v in history.list_versions(note_path)] == [first]
+
+
+def test_legacy_metadata_files_are_migrated(note_path):
+    """Test that per-version JSON files from older layouts are moved into the log."""
+    history_dir = history.get_history_dir() / note_path.stem
+    history_dir.mkdir()
+    for version_id in ["20240301093000", "20240302093000"]:
+        (history_dir / f"{version_id}.md").write_text("Old draft.", encoding="utf-8")
+        metadata = {
+            "version_id": version_id,
+            "timestamp": "2024-03-01T09:30:00",
+            "message": version_id,
+            "note_path": str(note_path),
+        }
+        (history_dir / f"{version_id}.json").write_text(
+            json.dumps(metadata, indent=2), encoding="utf-8"
+        )
+
+    expected = ["20240302093000", "20240301093000"]
+    assert [v["version_id"] for v in history.list_versions(note_path)] == expected
+    assert not list(history_dir.glob("*.json"))
+    assert [v["message"] for v in history.list_versions(note_path)] == expected
+
+
+def test_older_versions_are_packed_into_deltas(note_path):
+    """Test that packed versions read back exactly, and the newest stays a full copy."""
+    contents = []
+    for day in range(1, history.PACK_THRESHOLD + 4):
+        text = "".join(
+            f"Line {i} of day {day if i % 3 == 0 else 1}\n" for i in range(20)
+        ) + ("no trailing newline" * (day % 2))
+        note_path.write_text(text, encoding="utf-8")
+        contents.append(text)
+        save_at(note_path, datetime.datetime(2024, 3, day, 9, 30), f"day {day}")
+    history_dir = history.get_history_dir() / note_path.stem
+
+    version_ids = saved_ids(note_path)
+    assert len(version_ids) == len(contents)
+    assert (history_dir / f"{version_ids[-1]}.md").exists()
+    assert (history_dir / f"{version_ids[0]}.delta").exists()
+    assert [
+        history.get_version_content(note_path.stem, i) for i in range(len(contents))
+    ] == contents
+    assert len(history.list_versions(note_path)) == len(contents)
+
+    # Versions never change once saved, so reading one again doesn't touch the disk
+    with mock.patch("builtins.open") as open_file:
+        assert (
+            history.get_version_content(note_path.stem, version_ids[0]) == contents[0]
+        )
+    open_file.assert_not_called()
+
+    assert history.restore_version(note_path, 0)
+    assert note_path.read_text(encoding="utf-8") == contents[0]
+    assert history.restore_version(note_path, version_ids[-1])
+    assert note_path.read_text(encoding="utf-8") == contents[-1]
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+def test_large_diffs_match_difflib(note_path):
+    """Test that diffs computed by git read the same as difflib's."""
+    lines = [f"Line {i}\n" for i in range(300)]
+    note_path.write_text("".join(lines), encoding="utf-8")
+    first = save_at(note_path, datetime.datetime(2024, 3, 1, 9, 30), "first")
+    lines[5] = "Changed\n"
+    del lines[100:103]
+    lines[-1] = "No newline at the end"
+    note_path.write_text("".join(lines), encoding="utf-8")
+    second = save_at(note_path, datetime.datetime(2024, 3, 2, 9, 30), "second")
+
+    expected = history.compare_versions(note_path.stem, first, second)
+    history._clear_version_caches()
+    with (
+        mock.patch.object(history, "GIT_DIFF_THRESHOLD", 0),
+        mock.patch("difflib.unified_diff") as unified_diff,
+    ):
+        assert history.compare_versions(note_path.stem, first, second) == expected
+    unified_diff.assert_not_called()
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="git is not installed")
+def test_notes_over_the_git_threshold_ignore_git_config(note_path):
+    """Test that large notes diff like difflib whatever the user's git config says."""
+    lines = [
+        f"Line {i:05d} of a note long enough to be diffed by git\n" for i in range(2000)
+    ]
+    lines[10] = "\n"
+    assert len("".join(lines)) > history.GIT_DIFF_THRESHOLD
+    note_path.write_text("".join(lines), encoding="utf-8")
+    first = save_at(note_path, datetime.datetime(2024, 3, 1, 9, 30), "first")
+    lines[12] = "Changed\n"
+    lines[22] = "Changed again\n"
+    del lines[1000:1003]
+    note_path.write_text("".join(lines), encoding="utf-8")
+    second = save_at(note_path, datetime.datetime(2024, 3, 2, 9, 30), "second")
+
+    with mock.patch.object(history, "GIT_DIFF_THRESHOLD", float("inf")):
+        expected = history.compare_versions(note_path.stem, first, second)
+    history._clear_version_caches()
+    config = note_path.parent / "gitconfig"
+    config.write_text(
+        "[diff]\n"
+        "\tnoprefix = true\n"
+        "\tmnemonicPrefix = true\n"
+        "\tsuppressBlankEmpty = true\n"
+        "\tinterHunkContext = 10\n"
+        "\talgorithm = patience\n"
+        "\texternal = false\n"
+        "[color]\n"
+        "\tdiff = always\n",
+        encoding="utf-8",
+    )
+    with (
+        mock.patch.dict("os.environ", {"GIT_CONFIG_GLOBAL": str(config)}),
+        mock.patch("difflib.unified_diff") as unified_diff,
+    ):
+        assert history.compare_versions(note_path.stem, first, second) == expected
+    unified_diff.assert_not_called()
+
+
+def test_diff_skips_shared_lines_but_keeps_line_numbers(note_path):
+    """Test that trimming the common start and end gives the same diff as difflib on the whole note."""
+    lines = [f"Line {i}" for i in range(50)]
+    note_path.write_text("\n".join(lines), encoding="utf-8")
+    first = save_at(note_path, datetime.datetime(2024, 3, 1, 9, 30), "first")
+    lines[20] = "Changed"
+    lines.insert(30, "Added")
+    note_path.write_text("\n".join(lines), encoding="utf-8")
+    second = save_at(note_path, datetime.datetime(2024, 3, 2, 9, 30), "second")
+
+    expected = list(
+        difflib.unified_diff(
+            [f"Line {i}" for i in range(50)],
+            lines,
+            fromfile=f"Version {first}",
+            tofile=f"Version {second}",
+            lineterm="",
+        )
+    )
+    assert history.compare_versions(note_path.stem, first, second) == expected
+
+
+@pytest.mark.parametrize(
+    "old, new",
+    [
+        (["a", "b", "b", "b", "b", "a"], ["b", "b", "b", "a"]),
+        (["c", "c", "c", "a"], ["a", "c", "c", "c", "c", "a"]),
+        (["b", "b", "b", "b"], ["a", "a", "b", "b", "b", "b", "b"]),
+        (["a", "a", "a", "a", "a", "b"], ["a", "a", "a", "a", "b", "b"]),
+        (
+            ["# Plan", "", "- [ ] one", "", "- [ ] two", "", "- [ ] one", ""],
+            ["# Plan", "", "- [ ] one", "", "- [ ] three", "", "", "- [ ] one", ""],
+        ),
+    ],
+)
+def test_diff_with_repeated_lines_matches_difflib(note_path, old, new):
+    """Test that notes repeating lines around a change still diff exactly like difflib on the whole note."""
+    old_text = "\n".join(old)
+    new_text = "\n".join(new)
+    note_path.write_text(old_text, encoding="utf-8")
+    first = save_at(note_path, datetime.datetime(2024, 3, 1, 9, 30), "first")
+    note_path.write_text(new_text, encoding="utf-8")
+    second = save_at(note_path, datetime.datetime(2024, 3, 2, 9, 30), "second")
+
+    expected = list(
+        difflib.unified_diff(
+            old_text.splitlines(),
+            new_text.splitlines(),
+            fromfile=f"Version {first}",
+            tofile=f"Version {second}",
+            lineterm="",
+        )
+    )
+    assert history.compare_versions(note_path.stem, first, second) == expected
+
+
+def test_unchanged_saves_keep_one_copy(note_path):
+    """Test that saving an unchanged note turns the previous version into a reference to the new one."""
+    first = save_at(note_path, datetime.datetime(2024, 3, 1, 9, 30), "first")
+    second = save_at(note_path, datetime.datetime(2024, 3, 2, 9, 30), "second")
+    history_dir = history.get_history_dir() / note_path.stem
+
+    assert not (history_dir / f"{first}.md").exists()
+    assert (history_dir / f"{second}.md").exists()
+    assert history.get_version_content(note_path.stem, first) == "First draft."
+    assert history.compare_versions(note_path.stem, first, second) == []
+
+
+def test_saves_within_one_second_never_overwrite_a_delta_base(note_path):
+    """Test that a version saved in the same second as another gets its own ID."""
+    note_path.write_text("Same text\n", encoding="utf-8")
+    first = save_at(note_path, datetime.datetime(2024, 3, 1, 9, 0, 0), "first")
+    second = save_at(note_path, datetime.datetime(2024, 3, 1, 9, 0, 5), "second")
+    note_path.write_text("Changed text\n", encoding="utf-8")
+    third = save_at(note_path, datetime.datetime(2024, 3, 1, 9, 0, 5), "third")
+
+    assert third == f"{second}-001"
+    assert saved_ids(note_path) == [first, second, third]
+    assert history.get_version_content(note_path.stem, first) == "Same text\n"
+    assert history.get_version_content(note_path.stem, second) == "Same text\n"
+    assert history.get_version_content(note_path.stem, third) == "Changed text\n"
+    assert [v["message"] for v in history.list_versions(note_path)] == [
+        "third",
+        "second",
+        "first",
+    ]
+
+
+def test_packed_versions_survive_saves_within_one_second(note_path):
+    """Test that packing against the newest version stays correct when saves share a timestamp."""
+    contents = [f"Draft {i}\n" * 3 for i in range(history.PACK_THRESHOLD + 3)]
+    for text in contents:
+        note_path.write_text(text, encoding="utf-8")
+        save_at(note_path, datetime.datetime(2024, 3, 1, 9, 0, 0), "draft")
+
+    version_ids = saved_ids(note_path)
+    assert len(version_ids) == len(contents)
+    assert [
+        history.get_version_content(note_path.stem, i) for i in range(len(contents))
+    ] == contents
@@ -0,0 +1,327 @@
+"""Tests for the notes module."""
+
+import json
+import os
+import pathlib
+import stat
+import tempfile
+from unittest import mock
+
+import frontmatter
+import pytest
+
+from numen.notes import (
+    _find_ripgrep,
+    edit_note,
+    meta_cache,
+    scan_note_entries,
+    search_notes,
+    search_notes_many,
+    update_note_content,
+    update_tags,
+)
+from numen.utils import (
+    count_words,
+    dumps_post,
+    load_post_cached,
+    loads_post,
+    open_atomic,
+    parse_frontmatter,
+    read_frontmatter,
+    write_text_atomic,
+)
+
+NOTE = """---
+title: Weekly Review
+date: 2024-03-01T09:30:00
+tags:
+- work
+- review
+---
+
+Three words here.
+"""
+
+
+@pytest.fixture
+def temp_dirs():
+    """Provide a notes directory and a cache directory, with an empty metadata cache."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        notes_dir = pathlib.Path(temp_dir) / "notes"
+        cache_dir = pathlib.Path(temp_dir) / "cache"
+        notes_dir.mkdir()
+        with (
+            mock.patch("numen.notes.meta_cache.get_cache_dir", return_value=cache_dir),
+            mock.patch.object(meta_cache, "_entries", None),
+        ):
+            yield notes_dir, cache_dir
+
+
+def test_metadata_cache_reuses_unchanged_notes(temp_dirs):
+    """Test that metadata is parsed once and re-parsed only after the note changes."""
+    notes_dir, cache_dir = temp_dirs
+    note_path = notes_dir / "review.md"
+    note_path.write_text(NOTE, encoding="utf-8")
+
+    [meta] = meta_cache.load_many([note_path])
+    assert meta == {
+        "title": "Weekly Review",
+        "date": "2024-03-01T09:30:00",
+        "tags": ["work", "review"],
+        "word_count": 3,
+    }
+
+    with mock.patch.object(meta_cache, "_extract") as extract:
+        assert meta_cache.load_many([note_path]) == [meta]
+    extract.assert_not_called()
+
+    note_path.write_text(
+        NOTE.replace("Three words here.", "Now four words here."), encoding="utf-8"
+    )
+    assert meta_cache.load_many([note_path])[0]["word_count"] == 4
+
+    meta_cache.flush()
+    stored = json.loads((cache_dir / "notes_meta.json").read_text(encoding="utf-8"))
+    assert list(stored.values())[0]["meta"]["word_count"] == 4
+
+
+def test_failed_cache_flush_leaves_no_temporary_file(temp_dirs):
+    """Test that a cache write that fails keeps the old cache and cleans up after itself."""
+    notes_dir, cache_dir = temp_dirs
+    note_path = notes_dir / "review.md"
+    note_path.write_text(NOTE, encoding="utf-8")
+    meta_cache.load_many([note_path])
+
+    with mock.patch("os.replace", side_effect=OSError("disk full")):
+        meta_cache.flush()
+
+    assert list(cache_dir.iterdir()) == []
+    meta_cache.flush()
+    assert [path.name for path in cache_dir.iterdir()] == ["notes_meta.json"]
+
+
+def test_parse_frontmatter_matches_python_frontmatter():
+    """Test that the fast parser agrees with python-frontmatter on metadata and word count."""
+    for text in [
+        "",
+        "no frontmatter here",
+        "---\n---\nbody",
+        NOTE,
+        NOTE.replace("\n", "\r\n"),
+        "---\ntitle: open",
+    ]:
+        post = frontmatter.loads(text)
+        data = text.encode("utf-8")
+        metadata, body_start = parse_frontmatter(data)
+
+        assert metadata == post.metadata
+        assert count_words(data, body_start) == len(post.content.split())
+        assert count_words(post.content) == len(post.content.split())
+
+
+def test_loads_post_matches_frontmatter_loads():
+    """Test that the libyaml-backed loader parses notes exactly like frontmatter.loads."""
+    for text in [NOTE, "Intro\n\n---\n\nnot: frontmatter\n\n---\n", ""]:
+        expected = frontmatter.loads(text)
+        post = loads_post(text)
+
+        assert post.metadata == expected.metadata
+        assert post.content == expected.content
+        assert dumps_post(post) == frontmatter.dumps(expected)
+
+
+def test_search_notes_uses_ripgrep_when_available(temp_dirs):
+    """Test that ripgrep results are mapped back onto the scanned notes, and the fallback agrees."""
+    notes_dir, _ = temp_dirs
+    (notes_dir / "match.md").write_text(NOTE, encoding="utf-8")
+    (notes_dir / "other.md").write_text("Nothing relevant.", encoding="utf-8")
+    (notes_dir / "empty.md").write_text("", encoding="utf-8")
+
+    with mock.patch("numen.notes.get_notes_dir", return_value=notes_dir):
+        _find_ripgrep.cache_clear()
+        with mock.patch("shutil.which", return_value=None):
+            assert search_notes("WEEKLY") == [notes_dir / "match.md"]
+            assert search_notes("réview") == []
+            with mock.patch("numen.notes.SEARCH_THREAD_THRESHOLD", 1):
+                assert search_notes("weekly") == [notes_dir / "match.md"]
+
+        _find_ripgrep.cache_clear()
+        rg_output = mock.Mock(
+            returncode=0, stdout=str(notes_dir / "match.md").encode() + b"\0"
+        )
+        with (
+            mock.patch("shutil.which", return_value="/usr/bin/rg"),
+            mock.patch("numen.notes.subprocess.run", return_value=rg_output) as run,
+        ):
+            assert search_notes("weekly") == [notes_dir / "match.md"]
+        assert {"--no-config", "--fixed-strings"} <= set(run.call_args[0][0])
+        _find_ripgrep.cache_clear()
+
+
+def test_search_notes_many_agrees_with_search_notes(temp_dirs):
+    """Test that searching several queries at once gives each query's own results."""
+    notes_dir, _ = temp_dirs
+    (notes_dir / "match.md").write_text(NOTE, encoding="utf-8")
+    (notes_dir / "other.md").write_text("Nothing relevant.", encoding="utf-8")
+    queries = ["weekly", "NOTHING", "missing", ""]
+
+    with (
+        mock.patch("numen.notes.get_notes_dir", return_value=notes_dir),
+        mock.patch("numen.notes._find_ripgrep", return_value=None),
+    ):
+        results = search_notes_many(queries)
+        assert results == {query: search_notes(query) for query in queries}
+    assert results["weekly"] == [notes_dir / "match.md"]
+
+
+def test_writes_refresh_metadata_cache(temp_dirs):
+    """Test that updating a note's tags leaves a current cache entry behind."""
+    notes_dir, _ = temp_dirs
+    note_path = notes_dir / "review.md"
+    note_path.write_text(NOTE, encoding="utf-8")
+
+    with mock.patch("numen.notes.get_notes_dir", return_value=notes_dir):
+        assert update_tags("review", ["urgent"], ["work"])
+
+    with mock.patch.object(meta_cache, "_extract") as extract:
+        assert meta_cache.load_many([note_path])[0]["tags"] == ["review", "urgent"]
+    extract.assert_not_called()
+
+
+def test_load_many_parses_misses_in_worker_processes(temp_dirs):
+    """Test that load_many parses misses in a pool, reports unreadable notes and fills the cache."""
+    notes_dir, _ = temp_dirs
+    for i in range(3):
+        (notes_dir / f"note-{i}.md").write_text(
+            NOTE.replace("Weekly", f"Weekly {i}"), encoding="utf-8"
+        )
+    (notes_dir / "broken.md").write_text(
+        "---\ntitle: [unclosed\n---\n", encoding="utf-8"
+    )
+
+    entries = sorted(scan_note_entries(notes_dir), key=lambda entry: entry.name)
+    errors = []
+    with mock.patch.object(meta_cache, "PROCESS_POOL_THRESHOLD", 1):
+        metas = meta_cache.load_many(
+            entries, on_error=lambda entry, error: errors.append(entry.name)
+        )
+
+    assert errors == ["broken.md"]
+    assert metas[0] is None
+    assert [meta["title"] for meta in metas[1:]] == [
+        "Weekly 0 Review",
+        "Weekly 1 Review",
+        "Weekly 2 Review",
+    ]
+
+    with mock.patch.object(meta_cache, "_extract") as extract:
+        assert meta_cache.load_many([notes_dir / "note-1.md"]) == [metas[2]]
+    extract.assert_not_called()
+
+
+def test_read_frontmatter_stops_at_closing_delimiter(temp_dirs):
+    """Test that read_frontmatter agrees with parse_frontmatter without needing the body."""
+    notes_dir, _ = temp_dirs
+    note_path = notes_dir / "note.md"
+    for text in [
+        NOTE,
+        NOTE.replace("\n", "\r\n"),
+        "no frontmatter here",
+        "---\ntitle: open",
+    ]:
+        note_path.write_bytes(text.encode("utf-8"))
+        assert read_frontmatter(note_path) == parse_frontmatter(text.encode("utf-8"))[0]
+
+
+def test_update_note_content_appends_without_rewriting(temp_dirs):
+    """Test that appending AI output gives the same note as a load, append and dump."""
+    notes_dir, _ = temp_dirs
+    note_path = notes_dir / "review.md"
+    note_path.write_text(NOTE + "\n  \n", encoding="utf-8")
+
+    expected = frontmatter.loads(NOTE)
+    expected.content += "\n\n## AI-Generated Content\n\nMore words."
+
+    with mock.patch.object(frontmatter, "dumps") as dumps:
+        assert update_note_content(note_path, "More words.")
+    dumps.assert_not_called()
+
+    text = note_path.read_text(encoding="utf-8")
+    assert text.startswith(NOTE.rstrip())
+    post = frontmatter.loads(text)
+    assert post.metadata == expected.metadata
+    assert post.content == expected.content
+
+
+def test_load_post_cached_reparses_only_changed_files(temp_dirs):
+    """Test that an unchanged note is parsed once and callers can't alter each other's copy."""
+    notes_dir, _ = temp_dirs
+    note_path = notes_dir / "review.md"
+    note_path.write_text(NOTE, encoding="utf-8")
+
+    post = load_post_cached(note_path)
+    post["tags"].append("changed")
+    with mock.patch("numen.utils.loads_post") as parse:
+        again = load_post_cached(note_path)
+    parse.assert_not_called()
+    assert again.metadata == frontmatter.loads(NOTE).metadata
+    assert dumps_post(again) == dumps_post(loads_post(NOTE))
+
+    note_path.write_text(NOTE.replace("Weekly", "Monthly"), encoding="utf-8")
+    assert load_post_cached(note_path)["title"] == "Monthly Review"
+
+
+def test_updating_a_section_leaves_the_others_untouched(temp_dirs):
+    """Test that replacing one section keeps the rest of the note byte for byte."""
+    notes_dir, _ = temp_dirs
+    note_path = notes_dir / "review.md"
+    body = "Intro line.\n# First\n\nOne.\n## Second\nTwo.\n"
+    note_path.write_text(NOTE.replace("Three words here.\n", body), encoding="utf-8")
+
+    assert update_note_content(
+        note_path, "# First\nReplaced.", section=1, preserve_original=False
+    )
+
+    post = frontmatter.loads(note_path.read_text(encoding="utf-8"))
+    assert post.content == "Intro line.\n# First\nReplaced.\n## Second\nTwo."
+
+
+def test_editing_with_a_missing_editor_fails_cleanly(temp_dirs):
+    """Test that a missing editor is reported the same way with and without exec."""
+    notes_dir, _ = temp_dirs
+    note_path = notes_dir / "review.md"
+    note_path.write_text(NOTE, encoding="utf-8")
+
+    for replace_process in (False, True):
+        with (
+            mock.patch("numen.notes.get_notes_dir", return_value=notes_dir),
+            mock.patch(
+                "numen.config.get_editor",
+                return_value=str(notes_dir / "no-such-editor"),
+            ),
+            mock.patch("numen.history.save_version"),
+        ):
+            assert not edit_note("review", replace_process=replace_process)
+
+
+@pytest.mark.skipif(os.name != "posix", reason="file modes are POSIX-only")
+def test_atomic_writes_keep_file_permissions(temp_dirs):
+    """Test that atomic writes give new files the usual mode and keep an existing file's."""
+    notes_dir, _ = temp_dirs
+    path = notes_dir / "note.md"
+    umask = os.umask(0)
+    os.umask(umask)
+
+    write_text_atomic(path, "First.")
+    assert stat.S_IMODE(path.stat().st_mode) == 0o666 & ~umask
+
+    path.chmod(0o640)
+    with open_atomic(path) as f:
+        f.write(b"Second.")
+    assert stat.S_IMODE(path.stat().st_mode) == 0o640
+
+    with pytest.raises(RuntimeError), open_atomic(path) as f:
+        f.write(b"Partial")
+        raise RuntimeError("interrupted")
+    assert path.read_text(encoding="utf-8") == "Second."
+    assert [p.name for p in notes_dir.iterdir()] == ["note.md"]